@@ -1,21 +1,40 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, DeleteOne, InsertOne, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, ValidationError, model_validator
 from typing import List, Optional, Dict, Any
 import uuid
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import jwt
 import hashlib
 import requests
+import argparse
 import asyncio
+import base64
+import bisect
+import codecs
+import csv
+import heapq
+import itertools
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 import json
+import math
+import numpy as np
 
 
 ROOT_DIR = Path(__file__).parent
@@ -32,14 +51,443 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# CPU-bound work pools (bcrypt and Monte Carlo forecasts must not run on the event loop)
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '4'))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '64'))
+FORECAST_WORKERS = int(os.environ.get('FORECAST_WORKERS', '2'))
+FORECAST_MAX_PENDING = int(os.environ.get('FORECAST_MAX_PENDING', '16'))
+
+class WorkerPool:
+    """Bounded worker pool; rejects work with 503 once max_pending calls are in flight"""
+
+    def __init__(self, max_workers: int, max_pending: int, name: str, busy_detail: str):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.busy_detail = busy_detail
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.pending = 0
+        self.peak_pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self._running = 0
+        self._wait_seconds = 0.0
+        self._work_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _timed(self, func, enqueued_at, *args):
+        started_at = time.perf_counter()
+        with self._lock:
+            self._running += 1
+            self._wait_seconds += started_at - enqueued_at
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._work_seconds += time.perf_counter() - started_at
+
+    async def run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=self.busy_detail,
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        self.submitted += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executor, self._timed, func, time.perf_counter(), *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self):
+        with self._lock:
+            running = self._running
+            wait_seconds = self._wait_seconds
+            work_seconds = self._work_seconds
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "running": running,
+            "queue_depth": max(self.pending - running, 0),
+            "peak_pending": self.peak_pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": (wait_seconds / self.completed * 1000) if self.completed else 0,
+            "avg_work_ms": (work_seconds / self.completed * 1000) if self.completed else 0
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+password_hash_pool = WorkerPool(
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, "password-hash", "Authentication service is busy, please retry shortly"
+)
+forecast_pool = WorkerPool(
+    FORECAST_WORKERS, FORECAST_MAX_PENDING, "timeline-forecast", "Forecast service is busy, please retry shortly"
+)
+
+class TTLCache:
+    """In-process LRU cache whose entries also expire after ttl_seconds"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+# Resolved principals keyed by token subject (username); invalidated on user writes
+PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', '10000'))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.environ.get('PRINCIPAL_CACHE_TTL_SECONDS', '60'))
+principal_cache = TTLCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SECONDS)
+
+# Live updates: per-user in-process pub/sub feeding server-sent event streams
+EVENT_QUEUE_SIZE = int(os.environ.get('EVENT_QUEUE_SIZE', '100'))
+EVENT_MAX_STREAMS_PER_USER = int(os.environ.get('EVENT_MAX_STREAMS_PER_USER', '10'))
+EVENT_HEARTBEAT_SECONDS = float(os.environ.get('EVENT_HEARTBEAT_SECONDS', '15'))
+EVENT_STREAM_TOKEN_SECONDS = int(os.environ.get('EVENT_STREAM_TOKEN_SECONDS', '60'))
+EVENT_STREAM_TOKEN_SCOPE = "events:stream"
+
+class EventHub:
+    """Fans each user's change events out to that user's open streams in this process"""
+
+    def __init__(self, queue_size: int, max_streams_per_user: int):
+        self.queue_size = queue_size
+        self.max_streams_per_user = max_streams_per_user
+        self._subscribers = {}
+        self._next_id = 0
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+        self.rejected = 0
+
+    def check_capacity(self, user_id: str):
+        if len(self._subscribers.get(user_id, ())) >= self.max_streams_per_user:
+            self.rejected += 1
+            raise HTTPException(status_code=429, detail="Too many open event streams")
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        # Callers register from inside the stream so the matching unsubscribe always runs
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        streams = self._subscribers.get(user_id)
+        if streams is not None:
+            streams.discard(queue)
+            if not streams:
+                del self._subscribers[user_id]
+
+    def publish(self, user_id: str, event: str, data: Dict[str, Any]):
+        streams = self._subscribers.get(user_id)
+        self.published += 1
+        if not streams:
+            return
+        self._next_id += 1
+        message = (self._next_id, event, json.dumps(jsonable_encoder(data), separators=(",", ":")))
+        for queue in streams:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # A stalled client loses its backlog and is told to refetch instead of growing memory
+                self.overflows += 1
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait((self._next_id, "resync", "{}"))
+            self.delivered += 1
+
+    def close(self):
+        for streams in self._subscribers.values():
+            for queue in streams:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    def stats(self):
+        return {
+            "users": len(self._subscribers),
+            "streams": sum(len(streams) for streams in self._subscribers.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+            "rejected": self.rejected
+        }
+
+event_hub = EventHub(EVENT_QUEUE_SIZE, EVENT_MAX_STREAMS_PER_USER)
+
+# Write-behind buffering for append-only log documents
+LOG_BUFFER_CAPACITY = int(os.environ.get('LOG_BUFFER_CAPACITY', '10000'))
+LOG_BUFFER_BATCH_SIZE = int(os.environ.get('LOG_BUFFER_BATCH_SIZE', '500'))
+LOG_BUFFER_FLUSH_SECONDS = float(os.environ.get('LOG_BUFFER_FLUSH_SECONDS', '1'))
+LOG_BUFFER_PUT_TIMEOUT_SECONDS = float(os.environ.get('LOG_BUFFER_PUT_TIMEOUT_SECONDS', '0.5'))
+
+class WriteBehindBuffer:
+    """Bounded queue of documents flushed to a collection with insert_many on size or time thresholds"""
+
+    def __init__(self, collection_name: str, capacity: int, batch_size: int, flush_seconds: float, put_timeout: float):
+        self.collection_name = collection_name
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.put_timeout = put_timeout
+        self._queue = None
+        self._task = None
+        self._closed = False
+        self.enqueued = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failed = 0
+        self.direct_writes = 0
+        self.last_flush_ms = 0.0
+
+    def start(self):
+        if self._task is None and not self._closed:
+            self._queue = asyncio.Queue(maxsize=self.capacity)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def put(self, document: Dict[str, Any]):
+        """Enqueue a document; waits briefly when the buffer is full, then writes it through directly"""
+        self.start()
+        if self._closed:
+            await self._write_through(document)
+            return
+        try:
+            self._queue.put_nowait(document)
+        except asyncio.QueueFull:
+            # Backpressure: let the flusher catch up before falling back to a synchronous insert
+            try:
+                await asyncio.wait_for(self._queue.put(document), timeout=self.put_timeout)
+            except asyncio.TimeoutError:
+                await self._write_through(document)
+                return
+        self.enqueued += 1
+
+    async def _write_through(self, document: Dict[str, Any]):
+        self.direct_writes += 1
+        await db[self.collection_name].insert_one(document)
+
+    def _drain(self, batch: List[Dict[str, Any]]):
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+    async def _run(self):
+        # None in the queue is the close() sentinel: flush what was collected and stop
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_seconds
+            self._drain(batch)
+            while len(batch) < self.batch_size and None not in batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+                self._drain(batch)
+            stopping = None in batch
+            batch = [document for document in batch if document is not None]
+            if batch:
+                await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        started = time.perf_counter()
+        try:
+            await db[self.collection_name].insert_many(batch, ordered=False)
+            self.flushed += len(batch)
+        except Exception:
+            # Any failure only costs this batch; an exception escaping here would kill the flusher
+            self.failed += len(batch)
+            logger.exception("Dropped %s buffered %s documents", len(batch), self.collection_name)
+        self.batches += 1
+        self.last_flush_ms = (time.perf_counter() - started) * 1000
+
+    async def close(self):
+        """Stop the flusher and write out everything still buffered"""
+        self._closed = True
+        if self._task is None:
+            return
+        # A flusher that already died would never take the sentinel off a full queue
+        if self._task.done():
+            if not self._task.cancelled() and self._task.exception() is not None:
+                logger.error(
+                    "Write-behind flusher for %s stopped unexpectedly", self.collection_name, exc_info=self._task.exception()
+                )
+        else:
+            await self._queue.put(None)
+            await self._task
+        self._task = None
+        # Producers that were waiting on a full buffer may have enqueued after the sentinel
+        while not self._queue.empty():
+            batch = []
+            self._drain(batch)
+            batch = [document for document in batch if document is not None]
+            if batch:
+                await self._flush(batch)
+
+    def stats(self):
+        return {
+            "collection": self.collection_name,
+            "pending": self._queue.qsize() if self._queue else 0,
+            "capacity": self.capacity,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failed": self.failed,
+            "direct_writes": self.direct_writes,
+            "last_flush_ms": self.last_flush_ms
+        }
+
+progress_log_buffer = WriteBehindBuffer(
+    "progress_logs", LOG_BUFFER_CAPACITY, LOG_BUFFER_BATCH_SIZE, LOG_BUFFER_FLUSH_SECONDS, LOG_BUFFER_PUT_TIMEOUT_SECONDS
+)
+
+# Static catalog responses: validated and JSON-encoded once, served with strong ETags
+CATALOG_CACHE_CONTROL = os.environ.get('CATALOG_CACHE_CONTROL', 'public, max-age=300')
+
+class StaticCatalog:
+    """Registry of read-only payloads pre-encoded to JSON bytes and keyed by content hash"""
+
+    def __init__(self):
+        self._builders = {}
+        self._compiled = {}
+        self.not_modified = 0
+        self.served = 0
+
+    def register(self, key: str, builder):
+        self._builders[key] = builder
+        self._compiled.pop(key, None)
+
+    def compile(self, key: str, builder=None):
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            payload = (builder or self._builders[key])()
+            body = json.dumps(
+                jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+            ).encode("utf-8")
+            etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            compiled = (body, etag)
+            self._compiled[key] = compiled
+        return compiled
+
+    def compile_all(self):
+        for key in self._builders:
+            self.compile(key)
+
+    def invalidate(self, key: Optional[str] = None):
+        if key is None:
+            self._compiled.clear()
+        else:
+            self._compiled.pop(key, None)
+
+    def respond(self, request: Request, key: str, builder=None):
+        body, etag = self.compile(key, builder)
+        headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            if etag in candidates or "*" in candidates:
+                self.not_modified += 1
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        self.served += 1
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def stats(self):
+        return {
+            "registered": len(self._builders),
+            "compiled": len(self._compiled),
+            "served": self.served,
+            "not_modified": self.not_modified
+        }
+
+static_catalog = StaticCatalog()
 
 # Create the main app without a prefix
 app = FastAPI(title="Relocate Me API", version="2.0.0")
 
+def json_safe(value):
+    # Validation errors echo the rejected input, which may be a non-finite float JSON cannot carry
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    return value
+
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    return JSONResponse(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        content={"detail": json_safe(jsonable_encoder(exc.errors()))}
+    )
+
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
 # Models
+class JobProfile(BaseModel):
+    skills: List[str] = Field(default_factory=list, max_length=50)
+    preferred_categories: List[str] = Field(default_factory=list, max_length=20)
+    saved_jobs: List[str] = Field(default_factory=list, max_length=500)
+
 class User(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     username: str
@@ -49,6 +497,8 @@ class User(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     current_step: int = 1
     completed_steps: List[int] = Field(default_factory=list)
+    job_profile: JobProfile = Field(default_factory=JobProfile)
+    progress_seeded: bool = False  # sample progress items have been created for this account
 
 class UserCreate(BaseModel):
     username: str
@@ -100,6 +550,24 @@ class JobListing(BaseModel):
     posted_date: datetime
     application_url: str
     category: str
+    # Annualized pay parsed from salary at ingest time
+    salary_min: Optional[float] = None
+    salary_max: Optional[float] = None
+    # Resolved from location against the offline gazetteer; remote roles have none
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+    @model_validator(mode="after")
+    def normalize_salary(self):
+        if self.salary_min is None and self.salary_max is None:
+            self.salary_min, self.salary_max = parse_salary(self.salary)
+        return self
+
+    @model_validator(mode="after")
+    def geocode_location(self):
+        if self.latitude is None or self.longitude is None:
+            self.latitude, self.longitude = resolve_place(self.location) or (None, None)
+        return self
 
 class VisaRequirement(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -236,6 +704,7 @@ class ProgressItem(BaseModel):
     subtasks: List[Dict[str, Any]] = Field(default_factory=list)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    version: int = 1  # bumped by every write; exposed as the item's ETag
 
 class ProgressUpdate(BaseModel):
     status: Optional[str] = None
@@ -243,6 +712,18 @@ class ProgressUpdate(BaseModel):
     priority: Optional[str] = None
     due_date: Optional[datetime] = None
 
+class ProgressBulkOperation(BaseModel):
+    op: str  # "create", "update", "delete", "toggle_subtask"
+    id: Optional[str] = None
+    expected_version: Optional[int] = None  # same check as If-Match on the single-item endpoints
+    item: Optional[Dict[str, Any]] = None  # create
+    update: Optional[ProgressUpdate] = None  # update
+    subtask_index: Optional[int] = None  # toggle_subtask
+
+class ProgressBulkRequest(BaseModel):
+    operations: List[ProgressBulkOperation]
+    ordered: bool = True
+
 # Sample progress items for a real relocation scenario
 SAMPLE_PROGRESS_ITEMS = [
     {
@@ -773,6 +1254,257 @@ RELOCATION_TIMELINE = [
     {"id": 34, "title": "Long-term Setup", "description": "Establish routines, friendships, local connections", "category": "Settlement", "estimated_days": 60, "dependencies": [33], "resources": ["Social Groups", "Hobby Clubs", "Professional Networks"]}
 ]
 
+class TimelineGraph:
+    """Step dependency DAG compiled once: topological order, descendant sets and CPM schedules.
+
+    Steps are addressed by their position in the timeline, so a set of steps is an
+    int bitmask and a user's progress is a single completion mask.
+    """
+
+    def __init__(self, steps: List[Dict[str, Any]]):
+        self.steps = steps
+        self.step_ids = [step["id"] for step in steps]
+        self.index_of = {step_id: index for index, step_id in enumerate(self.step_ids)}
+        if len(self.index_of) != len(steps):
+            raise ValueError("Timeline step ids must be unique")
+        self.durations = [step["estimated_days"] for step in steps]
+        self.predecessors = []
+        self.successors = [[] for _ in steps]
+        for index, step in enumerate(steps):
+            preds = []
+            for dependency in step.get("dependencies", []):
+                if dependency not in self.index_of:
+                    raise ValueError(f"Step {step['id']} depends on unknown step {dependency}")
+                preds.append(self.index_of[dependency])
+                self.successors[self.index_of[dependency]].append(index)
+            self.predecessors.append(preds)
+        # Bit j of dependency_masks[i] is set when step i directly depends on step j
+        self.dependency_masks = [sum(1 << pred for pred in set(preds)) for preds in self.predecessors]
+        self.order = self._topological_order()
+        self.position_in_order = {index: position for position, index in enumerate(self.order)}
+        self.sinks = [index for index in range(len(steps)) if not self.successors[index]]
+        # Bit i of descendants[j] is set when step i (transitively) depends on step j
+        self.descendants = [0] * len(steps)
+        for index in reversed(self.order):
+            for successor in self.successors[index]:
+                self.descendants[index] |= (1 << successor) | self.descendants[successor]
+        self.all_mask = (1 << len(steps)) - 1
+        # Response templates: each step pre-rendered in both completion states, grouped by category
+        self.step_views = [({**step, "is_completed": False}, {**step, "is_completed": True}) for step in steps]
+        self.category_indices = {}
+        for index, step in enumerate(steps):
+            self.category_indices.setdefault(step["category"], []).append(index)
+        self.category_masks = {
+            category: sum(1 << index for index in indices) for category, indices in self.category_indices.items()
+        }
+        self.version = hashlib.sha256(
+            json.dumps([(step["id"], step["estimated_days"], step.get("dependencies", [])) for step in steps]).encode("utf-8")
+        ).hexdigest()[:16]
+        self._schedules = TTLCache(max_size=4096, ttl_seconds=3600)
+        self._forecasts = TTLCache(max_size=256, ttl_seconds=3600)
+
+    def _topological_order(self):
+        # Kahn's algorithm; ties broken by step id so the order is deterministic
+        in_degree = [len(preds) for preds in self.predecessors]
+        ready = [(self.step_ids[index], index) for index, degree in enumerate(in_degree) if degree == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            _, index = heapq.heappop(ready)
+            order.append(index)
+            for successor in self.successors[index]:
+                in_degree[successor] -= 1
+                if in_degree[successor] == 0:
+                    heapq.heappush(ready, (self.step_ids[successor], successor))
+        if len(order) != len(self.steps):
+            cyclic = sorted(self.step_ids[index] for index, degree in enumerate(in_degree) if degree > 0)
+            raise ValueError(f"Timeline dependencies contain a cycle involving steps {cyclic}")
+        return order
+
+    def completion_mask(self, completed_step_ids) -> int:
+        mask = 0
+        for step_id in completed_step_ids:
+            index = self.index_of.get(step_id)
+            if index is not None:
+                mask |= 1 << index
+        return mask
+
+    def completed_count(self, completed_mask: int, within: Optional[int] = None) -> int:
+        return bin(completed_mask & (self.all_mask if within is None else within)).count("1")
+
+    def overlay(self, completed_mask: int, indices=None) -> List[Dict[str, Any]]:
+        """Step views with is_completed set for a user, without copying any step"""
+        indices = range(len(self.steps)) if indices is None else indices
+        return [self.step_views[index][completed_mask >> index & 1] for index in indices]
+
+    def unblocked_mask(self, completed_mask: int) -> int:
+        """Open steps whose dependencies are all complete, as a bitmask"""
+        missing = ~completed_mask
+        ready = 0
+        for index, dependency_mask in enumerate(self.dependency_masks):
+            if not dependency_mask & missing:
+                ready |= 1 << index
+        return ready & missing & self.all_mask
+
+    def unlocked_by(self, index: int, completed_mask: int) -> List[int]:
+        """Ids of the open steps that completing step index would unblock"""
+        missing = ~(completed_mask | 1 << index)
+        return [
+            self.step_ids[successor] for successor in self.successors[index]
+            if missing >> successor & 1 and not self.dependency_masks[successor] & missing
+        ]
+
+    def remaining_duration(self, index: int, completed_mask: int) -> int:
+        return 0 if completed_mask >> index & 1 else self.durations[index]
+
+    def _forward_pass(self, completed_mask: int, earliest_finish: List[int], indices):
+        for index in indices:
+            start = max((earliest_finish[pred] for pred in self.predecessors[index]), default=0)
+            earliest_finish[index] = start + self.remaining_duration(index, completed_mask)
+
+    def schedule(self, completed_mask: int, previous_mask: Optional[int] = None):
+        """CPM schedule (in days from now) for the remaining work under a completion mask.
+
+        When the schedule for previous_mask is cached, only the descendants of the
+        steps whose completion changed are recomputed in the forward pass.
+        """
+        cached = self._schedules.get(completed_mask)
+        if cached is not None:
+            return cached
+        
+        previous = self._schedules.get(previous_mask) if previous_mask is not None else None
+        if previous is not None:
+            changed = completed_mask ^ previous_mask
+            affected = changed
+            for index in range(len(self.steps)):
+                if changed >> index & 1:
+                    affected |= self.descendants[index]
+            earliest_finish = list(previous["earliest_finish"])
+            self._forward_pass(completed_mask, earliest_finish, (index for index in self.order if affected >> index & 1))
+        else:
+            earliest_finish = [0] * len(self.steps)
+            self._forward_pass(completed_mask, earliest_finish, self.order)
+        
+        durations = [self.remaining_duration(index, completed_mask) for index in range(len(self.steps))]
+        earliest_start = [earliest_finish[index] - durations[index] for index in range(len(self.steps))]
+        project_duration = max(earliest_finish, default=0)
+        latest_finish = [project_duration] * len(self.steps)
+        for index in reversed(self.order):
+            if self.successors[index]:
+                latest_finish[index] = min(latest_finish[successor] - durations[successor] for successor in self.successors[index])
+        slack = [latest_finish[index] - earliest_finish[index] for index in range(len(self.steps))]
+        
+        # Walk one zero-slack chain from a start step to the finishing step, listing open steps
+        critical_path = []
+        candidates = [index for index in self.order if not self.predecessors[index] and slack[index] == 0]
+        while candidates:
+            index = min(candidates, key=lambda candidate: (earliest_start[candidate], self.step_ids[candidate]))
+            if not completed_mask >> index & 1:
+                critical_path.append(self.step_ids[index])
+            candidates = [
+                successor for successor in self.successors[index]
+                if slack[successor] == 0 and earliest_start[successor] == earliest_finish[index]
+            ]
+        
+        result = {
+            "durations": durations,
+            "earliest_start": earliest_start,
+            "earliest_finish": earliest_finish,
+            "latest_finish": latest_finish,
+            "slack": slack,
+            "project_duration": project_duration,
+            "critical_path": critical_path
+        }
+        self._schedules.set(completed_mask, result)
+        return result
+
+    def sample_durations(self, completed_mask: int, trials: int, distribution: str, spread: float, rng):
+        """trials x steps matrix of sampled remaining durations (days); completed steps are zero"""
+        estimate = np.array(self.durations, dtype=np.float64)
+        # Steps may override the spread with explicit optimistic/pessimistic bounds
+        low = np.array([step.get("optimistic_days", days * (1 - spread / 2)) for step, days in zip(self.steps, self.durations)], dtype=np.float64)
+        high = np.array([step.get("pessimistic_days", days * (1 + spread)) for step, days in zip(self.steps, self.durations)], dtype=np.float64)
+        shape = (trials, len(self.steps))
+        
+        if distribution == "triangular":
+            # Inverse-CDF sampling keeps degenerate (low == high) steps well defined
+            u = rng.random(shape)
+            width = high - low
+            mode_fraction = np.divide(estimate - low, width, out=np.zeros_like(width), where=width > 0)
+            samples = np.where(
+                u < mode_fraction,
+                low + np.sqrt(u * width * (estimate - low)),
+                high - np.sqrt((1 - u) * width * (high - estimate))
+            )
+        elif distribution == "lognormal":
+            samples = estimate * rng.lognormal(mean=0.0, sigma=spread, size=shape)
+        elif distribution == "uniform":
+            samples = low + (high - low) * rng.random(shape)
+        else:
+            raise ValueError(f"Unknown duration distribution: {distribution}")
+        
+        completed = np.array([bool(completed_mask >> index & 1) for index in range(len(self.steps))])
+        samples[:, completed] = 0.0
+        return samples
+
+    async def forecast(self, pool: WorkerPool, completed_mask: int, trials: int = 10000, distribution: str = "triangular", spread: float = 0.5, seed: int = 0):
+        """Monte Carlo completion forecast; the simulation runs on the worker pool and caches stay on the event loop"""
+        cache_key = (self.version, completed_mask, trials, distribution, spread, seed)
+        cached = self._forecasts.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        deterministic = self.schedule(completed_mask)["project_duration"]
+        result = await pool.run(self.simulate, completed_mask, trials, distribution, spread, seed, deterministic)
+        self._forecasts.set(cache_key, result)
+        return result
+
+    def simulate(self, completed_mask: int, trials: int, distribution: str, spread: float, seed: int, deterministic: float):
+        """Each CPM pass runs across all trials at once"""
+        durations = self.sample_durations(completed_mask, trials, distribution, spread, np.random.default_rng(seed))
+        finish = np.zeros_like(durations)
+        for index in self.order:
+            preds = self.predecessors[index]
+            start = finish[:, preds].max(axis=1) if preds else 0.0
+            finish[:, index] = start + durations[:, index]
+        project = finish[:, self.sinks].max(axis=1)
+        
+        latest_finish = np.repeat(project[:, None], len(self.steps), axis=1)
+        for index in reversed(self.order):
+            successors = self.successors[index]
+            if successors:
+                latest_finish[:, index] = (latest_finish[:, successors] - durations[:, successors]).min(axis=1)
+        on_critical_path = (latest_finish - finish) < 1e-9
+        criticality = on_critical_path.mean(axis=0)
+        criticality[[bool(completed_mask >> index & 1) for index in range(len(self.steps))]] = 0.0
+        
+        p10, p50, p90 = np.percentile(project, [10, 50, 90])
+        return {
+            "trials": trials,
+            "distribution": distribution,
+            "spread": spread,
+            "mean_days": float(project.mean()),
+            "p10_days": float(p10),
+            "p50_days": float(p50),
+            "p90_days": float(p90),
+            "deterministic_days": deterministic,
+            "probability_by_deterministic": float((project <= deterministic + 1e-9).mean()),
+            "criticality": {self.step_ids[index]: float(criticality[index]) for index in range(len(self.steps))}
+        }
+
+    def current_phase(self, completed_mask: int) -> str:
+        """Category of the earliest-startable step that is still open"""
+        if completed_mask & self.all_mask == self.all_mask:
+            return self.steps[self.order[-1]]["category"]
+        schedule = self.schedule(completed_mask)
+        index = min(
+            (index for index in range(len(self.steps)) if not completed_mask >> index & 1),
+            key=lambda index: (schedule["earliest_start"][index], self.position_in_order[index])
+        )
+        return self.steps[index]["category"]
+
+timeline_graph = TimelineGraph(RELOCATION_TIMELINE)
+
 # Authentication functions
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -780,6 +1512,12 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password, hashed_password):
+    return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await password_hash_pool.run(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -791,29 +1529,58 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return await resolve_user_token(credentials.credentials)
+
+# Operators allowed to change shared data such as the job catalog, e.g. ADMIN_USERNAMES=alice,bob
+ADMIN_USERNAMES = frozenset(name.strip() for name in os.environ.get('ADMIN_USERNAMES', '').split(',') if name.strip())
+
+async def get_admin_user(current_user: User = Depends(get_current_user)):
+    if current_user.username not in ADMIN_USERNAMES:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Administrator access required")
+    return current_user
+
+async def get_stream_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    token: Optional[str] = None
+):
+    # EventSource cannot send headers; the URL carries a short-lived stream token, never the login token
+    if credentials is not None:
+        return await resolve_user_token(credentials.credentials)
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return await resolve_user_token(token, scope=EVENT_STREAM_TOKEN_SCOPE)
+
+async def resolve_user_token(token: str, scope: Optional[str] = None) -> User:
+    """User for a JWT; login tokens carry no scope, stream tokens are only accepted where their scope is expected"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
-        if username is None:
+        if username is None or payload.get("scope") != scope:
             raise credentials_exception
     except jwt.PyJWTError:
         raise credentials_exception
     
+    cached_user = principal_cache.get(username)
+    if cached_user is not None:
+        return cached_user
+    
     user = await db.users.find_one({"username": username})
     if user is None:
         raise credentials_exception
-    return User(**user)
+    current_user = User(**user)
+    principal_cache.set(username, current_user)
+    return current_user
 
 # Initialize default user on startup
 async def create_default_user():
     existing_user = await db.users.find_one({"username": "relocate_user"})
     if not existing_user:
-        hashed_password = get_password_hash("SecurePass2025!")
+        hashed_password = await get_password_hash_async("SecurePass2025!")
         default_user = User(
             username="relocate_user",
             email="relocate@example.com",
@@ -821,7 +1588,11 @@ async def create_default_user():
             current_step=1,
             completed_steps=[1, 2, 3, 8, 12]  # Some example completed steps
         )
-        await db.users.insert_one(default_user.dict())
+        try:
+            await db.users.insert_one(default_user.dict())
+        except DuplicateKeyError:
+            return  # Another replica created it first
+        await seed_sample_progress_items(default_user.id)
         print("Default user created successfully")
 
 # Password reset endpoints
@@ -865,11 +1636,12 @@ async def complete_password_reset(reset_data: PasswordResetComplete):
             detail="Reset code has expired"
         )
     
-    hashed_password = get_password_hash(reset_data.new_password)
+    hashed_password = await get_password_hash_async(reset_data.new_password)
     await db.users.update_one(
         {"username": reset_data.username},
         {"$set": {"hashed_password": hashed_password}}
     )
+    principal_cache.invalidate(reset_data.username)
     
     await db.password_resets.delete_one({"_id": reset_record["_id"]})
     return {"message": "Password reset successfully"}
@@ -877,7 +1649,7 @@ async def complete_password_reset(reset_data: PasswordResetComplete):
 @api_router.post("/auth/login", response_model=Token)
 async def login(user_credentials: UserLogin):
     user = await db.users.find_one({"username": user_credentials.username})
-    if not user or not verify_password(user_credentials.password, user["hashed_password"]):
+    if not user or not await verify_password_async(user_credentials.password, user["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -894,151 +1666,1014 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 # Job listings endpoints
-@api_router.get("/jobs/listings")
-async def get_job_listings(category: Optional[str] = None, job_type: Optional[str] = None):
-    jobs = []
-    for job_data in SAMPLE_JOBS:
-        job = JobListing(**job_data)
-        if category and job.category != category:
+# Advertised pay periods and how many of each make a working year (37.5h weeks, 230 working days)
+SALARY_PERIODS = (
+    (re.compile(r"(?:\b(?:per|an|a)\s*|/\s*)(?:hour|hr)\b|\bhourly\b|\bph\b|\bp/h\b", re.IGNORECASE), 1950),
+    (re.compile(r"(?:\b(?:per|a)\s*|/\s*)day\b|\bdaily\b|\bpd\b|\bp/d\b", re.IGNORECASE), 230),
+    (re.compile(r"(?:\b(?:per|a)\s*|/\s*)week\b|\bweekly\b|\bpw\b|\bp/w\b", re.IGNORECASE), 52),
+    (re.compile(r"(?:\b(?:per|a)\s*|/\s*)month\b|\bmonthly\b|\bpcm\b", re.IGNORECASE), 12),
+)
+# A pay figure counts only with a currency sign or a "k" suffix, so percentages, FTE ratios and
+# other numbers in the text are ignored; a second figure after "-" or "to" closes a range
+SALARY_AMOUNT = r"([£$€])?\s*(\d[\d,]*(?:\.\d+)?)\s*(k\b)?"
+SALARY_RANGE = re.compile(SALARY_AMOUNT + r"(?:\s*(?:-|–|to)\s*" + SALARY_AMOUNT + r")?", re.IGNORECASE)
+SALARY_MAX_RANGE_RATIO = 10
+
+def parse_salary(salary: Optional[str]):
+    """Annualized (min, max) from free-text pay such as "£28,000 - £35,000" or "£25 - £45 per hour" """
+    for match in SALARY_RANGE.finditer(salary or ""):
+        low_currency, low_number, low_thousands, high_currency, high_number, high_thousands = match.groups()
+        has_high = high_number is not None and bool(high_currency or high_thousands or low_currency)
+        if not (low_currency or low_thousands or (has_high and (high_currency or high_thousands))):
+            continue
+        low = float(low_number.replace(",", ""))
+        high = float(high_number.replace(",", "")) if has_high else low
+        # "£25-£30k": a k on either end of a range applies to both
+        if low_thousands or (has_high and high_thousands):
+            low, high = (value * 1000 if value < 1000 else value for value in (low, high))
+        low, high = min(low, high), max(low, high)
+        if low <= 0 or high / low > SALARY_MAX_RANGE_RATIO:
+            return None, None
+        multiplier = next((periods for pattern, periods in SALARY_PERIODS if pattern.search(salary)), 1)
+        return round(low * multiplier, 2), round(high * multiplier, 2)
+    return None, None
+
+# Offline gazetteer: place names resolve to coordinates without any external geocoding call
+GAZETTEER = {
+    "peak district": (53.3500, -1.8300),
+    "bakewell": (53.2137, -1.6757),
+    "castleton": (53.3436, -1.7767),
+    "matlock": (53.1380, -1.5550),
+    "buxton": (53.2587, -1.9118),
+    "kinder scout": (53.3847, -1.8727),
+    "hathersage": (53.3296, -1.6533),
+    "glossop": (53.4430, -1.9490),
+    "leek": (53.1050, -2.0230),
+    "ashbourne": (53.0160, -1.7320),
+    "chesterfield": (53.2350, -1.4210),
+    "sheffield": (53.3811, -1.4701),
+    "stockport": (53.4106, -2.1575),
+    "manchester": (53.4808, -2.2426),
+    "derby": (52.9225, -1.4746),
+    "nottingham": (52.9548, -1.1581),
+    "leeds": (53.8008, -1.5491),
+    "birmingham": (52.4862, -1.8904),
+    "bristol": (51.4545, -2.5879),
+    "london": (51.5072, -0.1276),
+    "edinburgh": (55.9533, -3.1883),
+    "phoenix": (33.4484, -112.0740),
+    "scottsdale": (33.4942, -111.9261),
+    "tempe": (33.4255, -111.9400),
+    "austin": (30.2672, -97.7431),
+    "denver": (39.7392, -104.9903),
+    "new york": (40.7128, -74.0060)
+}
+GAZETTEER_ALIASES = {"peak-district": "peak district", "kinder": "kinder scout"}
+# Coverage regions as (lat_min, lat_max, lon_min, lon_max) bounding boxes
+GAZETTEER_REGIONS = {
+    "worldwide": (-90.0, 90.0, -180.0, 180.0),
+    "north america": (7.0, 84.0, -168.0, -52.0),
+    "europe": (35.0, 72.0, -25.0, 45.0),
+    "us": (24.5, 49.5, -125.0, -66.9),
+    "uk": (49.8, 60.9, -8.7, 1.8)
+}
+GAZETTEER_REGION_ALIASES = {"usa": "us", "united states": "us", "united kingdom": "uk", "great britain": "uk", "gb": "uk"}
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LATITUDE = 69.0
+
+def resolve_place(text: Optional[str]):
+    """Coordinates of the most specific gazetteer place named in text, e.g. "Castleton, Peak District" """
+    for part in re.split(r"[,()/]", (text or "").casefold()):
+        name = part.strip()
+        name = GAZETTEER_ALIASES.get(name, name)
+        if name in GAZETTEER:
+            return GAZETTEER[name]
+    return None
+
+def resolve_regions(text: Optional[str]) -> List[str]:
+    regions = []
+    for part in re.split(r",|\bto\b|\band\b", (text or "").casefold()):
+        name = part.strip()
+        name = GAZETTEER_REGION_ALIASES.get(name, name)
+        if name in GAZETTEER_REGIONS and name not in regions:
+            regions.append(name)
+    return regions
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    """Great-circle distance; accepts scalars or numpy arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(value) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def distance_to_region_miles(lat: float, lon: float, region: str) -> float:
+    lat_min, lat_max, lon_min, lon_max = GAZETTEER_REGIONS[region]
+    nearest_lat, nearest_lon = min(max(lat, lat_min), lat_max), min(max(lon, lon_min), lon_max)
+    return float(haversine_miles(lat, lon, nearest_lat, nearest_lon))
+
+class SpatialGrid:
+    """Fixed-size lat/lon grid of point ids for radius queries"""
+    
+    def __init__(self, cell_degrees: float = 0.1):
+        self.cell_degrees = cell_degrees
+        self._cells = {}
+        self._points = {}
+    
+    def __len__(self):
+        return len(self._points)
+    
+    def _cell(self, lat: float, lon: float):
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+    
+    def add(self, item_id: str, lat: float, lon: float):
+        self.remove(item_id)
+        self._points[item_id] = (lat, lon)
+        self._cells.setdefault(self._cell(lat, lon), set()).add(item_id)
+    
+    def remove(self, item_id: str):
+        point = self._points.pop(item_id, None)
+        if point is not None:
+            cell = self._cell(*point)
+            self._cells[cell].discard(item_id)
+            if not self._cells[cell]:
+                del self._cells[cell]
+    
+    def within(self, lat: float, lon: float, radius_miles: float) -> Dict[str, float]:
+        """Distance in miles for every point within the radius"""
+        lat_span = radius_miles / MILES_PER_DEGREE_LATITUDE
+        lon_span = lat_span / max(math.cos(math.radians(min(abs(lat) + lat_span, 89.9))), 1e-6)
+        low_row, low_column = self._cell(lat - lat_span, lon - lon_span)
+        high_row, high_column = self._cell(lat + lat_span, lon + lon_span)
+        ids = []
+        if (high_row - low_row + 1) * (high_column - low_column + 1) > len(self._cells):
+            # Huge radius: every occupied cell is a candidate
+            for members in self._cells.values():
+                ids.extend(members)
+        else:
+            for row in range(low_row, high_row + 1):
+                for column in range(low_column, high_column + 1):
+                    ids.extend(self._cells.get((row, column), ()))
+        if not ids:
+            return {}
+        coordinates = np.array([self._points[item_id] for item_id in ids], dtype=np.float64)
+        distances = haversine_miles(lat, lon, coordinates[:, 0], coordinates[:, 1])
+        return {ids[slot]: float(distances[slot]) for slot in np.flatnonzero(distances <= radius_miles)}
+
+TEXT_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it of on or our the to with within you your".split()
+)
+
+def tokenize_text(text: str) -> List[str]:
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        if token in TEXT_STOPWORDS:
+            continue
+        # Light plural folding so "skills" matches "skill"
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+class TextSearchIndex:
+    """Incrementally updated BM25 index; scoring is vectorized over per-term posting arrays"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._slot_of = {}
+        self._doc_ids = []
+        self._free_slots = []
+        self._lengths = np.zeros(1024, dtype=np.float64)
+        self._total_length = 0.0
+        self._doc_terms = {}
+        self._postings = {}
+        self._compiled = {}
+        self._tfidf = None
+
+    def __len__(self):
+        return len(self._slot_of)
+
+    def add(self, doc_id: str, weighted_fields):
+        """Index doc_id from (text, weight) pairs, replacing any previous version"""
+        if doc_id in self._slot_of:
+            self.remove(doc_id)
+        term_freqs = {}
+        for text, weight in weighted_fields:
+            for token in tokenize_text(text):
+                term_freqs[token] = term_freqs.get(token, 0) + weight
+        
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._doc_ids[slot] = doc_id
+        else:
+            slot = len(self._doc_ids)
+            self._doc_ids.append(doc_id)
+            if slot >= len(self._lengths):
+                self._lengths = np.concatenate([self._lengths, np.zeros(len(self._lengths))])
+        self._slot_of[doc_id] = slot
+        length = float(sum(term_freqs.values()))
+        self._lengths[slot] = length
+        self._total_length += length
+        self._doc_terms[doc_id] = term_freqs
+        for term, freq in term_freqs.items():
+            self._postings.setdefault(term, {})[slot] = freq
+            self._compiled.pop(term, None)
+        self._tfidf = None
+
+    def remove(self, doc_id: str):
+        slot = self._slot_of.pop(doc_id, None)
+        if slot is None:
+            return
+        for term in self._doc_terms.pop(doc_id):
+            posting = self._postings[term]
+            del posting[slot]
+            if not posting:
+                del self._postings[term]
+            self._compiled.pop(term, None)
+        self._total_length -= self._lengths[slot]
+        self._lengths[slot] = 0.0
+        self._doc_ids[slot] = None
+        self._free_slots.append(slot)
+        self._tfidf = None
+
+    def _posting_arrays(self, term: str):
+        compiled = self._compiled.get(term)
+        if compiled is None:
+            posting = self._postings[term]
+            compiled = (
+                np.fromiter(posting.keys(), dtype=np.int64, count=len(posting)),
+                np.fromiter(posting.values(), dtype=np.float64, count=len(posting))
+            )
+            self._compiled[term] = compiled
+        return compiled
+
+    def search(self, query: str, limit: int = 20, candidates=None):
+        """Return [(doc_id, score)] best first; candidates optionally restricts the doc ids considered"""
+        terms = [term for term in dict.fromkeys(tokenize_text(query)) if term in self._postings]
+        doc_count = len(self._slot_of)
+        if not terms or not doc_count:
+            return [], 0
+        
+        slot_count = len(self._doc_ids)
+        avg_length = self._total_length / doc_count
+        norms = self.k1 * (1 - self.b + self.b * self._lengths[:slot_count] / avg_length)
+        scores = np.zeros(slot_count)
+        for term in terms:
+            slots, freqs = self._posting_arrays(term)
+            idf = math.log(1 + (doc_count - len(slots) + 0.5) / (len(slots) + 0.5))
+            scores[slots] += idf * freqs * (self.k1 + 1) / (freqs + norms[slots])
+        
+        if candidates is not None:
+            allowed = np.zeros(slot_count, dtype=bool)
+            allowed[[self._slot_of[doc_id] for doc_id in candidates if doc_id in self._slot_of]] = True
+            scores[~allowed] = 0.0
+        
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > limit:
+            matched = matched[np.argpartition(-scores[matched], limit - 1)[:limit]]
+        ranked = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(self._doc_ids[slot], float(scores[slot])) for slot in ranked], int(np.count_nonzero(scores > 0))
+
+    def term_frequencies(self, doc_id: str) -> Dict[str, float]:
+        return self._doc_terms.get(doc_id, {})
+
+    def tfidf_matrix(self):
+        """Term-major sparse matrix of L2-normalized TF-IDF weights, rebuilt lazily after changes
+
+        Returns (columns, indptr, slots, weights, idf): the entries for term t are
+        slots[indptr[columns[t]]:indptr[columns[t] + 1]] with the matching weights.
+        """
+        if self._tfidf is None:
+            doc_count = max(len(self._slot_of), 1)
+            terms = list(self._postings)
+            columns = {term: column for column, term in enumerate(terms)}
+            sizes = np.fromiter((len(self._postings[term]) for term in terms), dtype=np.int64, count=len(terms))
+            indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+            np.cumsum(sizes, out=indptr[1:])
+            arrays = [self._posting_arrays(term) for term in terms]
+            slots = np.concatenate([posting[0] for posting in arrays]) if arrays else np.zeros(0, dtype=np.int64)
+            freqs = np.concatenate([posting[1] for posting in arrays]) if arrays else np.zeros(0)
+            idf = np.log((1 + doc_count) / (1 + sizes)) + 1
+            # Sublinear term frequency, then cosine-normalize each document row
+            weights = (1 + np.log(freqs)) * np.repeat(idf, sizes)
+            norms = np.sqrt(np.bincount(slots, weights=weights ** 2, minlength=len(self._doc_ids)))
+            weights /= np.where(norms[slots] > 0, norms[slots], 1.0)
+            self._tfidf = (columns, indptr, slots, weights, dict(zip(terms, idf)))
+        return self._tfidf
+
+    def similar(self, term_weights: Dict[str, float], limit: int = 10, exclude=(), bonus_ids=(), bonus: float = 0.0):
+        """Return [(doc_id, score)] best first: cosine similarity to a weighted bag of terms plus a flat bonus for bonus_ids"""
+        columns, indptr, slots, weights, idf = self.tfidf_matrix()
+        query = {term: (1 + math.log(weight)) * idf[term] for term, weight in term_weights.items() if term in columns and weight >= 1}
+        scores = np.zeros(len(self._doc_ids))
+        if query:
+            # Gather every matching column at once and accumulate per document slot
+            query_norm = math.sqrt(sum(value * value for value in query.values()))
+            starts = np.fromiter((indptr[columns[term]] for term in query), dtype=np.int64, count=len(query))
+            stops = np.fromiter((indptr[columns[term] + 1] for term in query), dtype=np.int64, count=len(query))
+            positions = np.concatenate([np.arange(start, stop) for start, stop in zip(starts, stops)])
+            query_values = np.repeat(np.fromiter(query.values(), dtype=np.float64, count=len(query)), stops - starts)
+            scores += np.bincount(slots[positions], weights=weights[positions] * query_values, minlength=len(scores)) / query_norm
+        if bonus:
+            bonus_slots = [self._slot_of[doc_id] for doc_id in bonus_ids if doc_id in self._slot_of]
+            scores[bonus_slots] += bonus
+        
+        for doc_id in exclude:
+            slot = self._slot_of.get(doc_id)
+            if slot is not None:
+                scores[slot] = 0.0
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > limit:
+            matched = matched[np.argpartition(-scores[matched], limit - 1)[:limit]]
+        ranked = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(self._doc_ids[slot], float(scores[slot])) for slot in ranked]
+
+JOB_SEARCH_FIELD_WEIGHTS = (("title", 3), ("company", 2), ("description", 1), ("requirements", 1), ("benefits", 1))
+
+def job_search_fields(job: Dict[str, Any]):
+    for field, weight in JOB_SEARCH_FIELD_WEIGHTS:
+        value = job.get(field) or ""
+        yield (" ".join(value) if isinstance(value, list) else value), weight
+
+class JobIndex:
+    """In-memory job store with inverted indexes per facet and presorted orderings"""
+
+    FACETS = ("category", "job_type", "location", "company")
+    SORT_KEYS = {
+        "posted_date": lambda job: job["posted_date"].timestamp(),
+        # Listings without a parsed salary sort below everything else
+        "salary": lambda job: job["salary_min"] if job.get("salary_min") is not None else -1.0
+    }
+    # Sorted (value, id) arrays over listings that advertise pay, answered by binary search
+    RANGE_KEYS = ("salary_min", "salary_max")
+
+    def __init__(self):
+        self._boot_id = uuid.uuid4().hex[:8]
+        self._revision = 0
+        self._jobs = {}
+        self._postings = {facet: {} for facet in self.FACETS}
+        self._facet_labels = {facet: {} for facet in self.FACETS}
+        self._sort_values = {sort: {} for sort in self.SORT_KEYS}
+        self._orders = {sort: [] for sort in self.SORT_KEYS}
+        self._ranges = {key: [] for key in self.RANGE_KEYS}
+        self._listeners = []
+        self.text = TextSearchIndex()
+        self.geo = SpatialGrid()
+
+    @property
+    def version(self) -> str:
+        return f"{self._boot_id}-{self._revision}"
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def get(self, job_id: str):
+        return self._jobs.get(job_id)
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    @staticmethod
+    def _facet_key(value: str) -> str:
+        return value.strip().casefold()
+
+    def _unlink(self, job_id: str, incremental: bool):
+        job = self._jobs.pop(job_id)
+        self.text.remove(job_id)
+        self.geo.remove(job_id)
+        for facet in self.FACETS:
+            key = self._facet_key(job[facet])
+            posting = self._postings[facet].get(key)
+            if posting is not None:
+                posting.discard(job_id)
+                if not posting:
+                    del self._postings[facet][key]
+                    del self._facet_labels[facet][key]
+        for sort, values in self._sort_values.items():
+            entry = (values.pop(job_id), job_id)
+            if incremental:
+                order = self._orders[sort]
+                del order[bisect.bisect_left(order, entry)]
+        for key in self.RANGE_KEYS:
+            if job.get(key) is not None and incremental:
+                bounds = self._ranges[key]
+                del bounds[bisect.bisect_left(bounds, (job[key], job_id))]
+
+    def _link(self, job: Dict[str, Any], incremental: bool):
+        job_id = job["id"]
+        self._jobs[job_id] = job
+        self.text.add(job_id, job_search_fields(job))
+        if job.get("latitude") is not None and job.get("longitude") is not None:
+            self.geo.add(job_id, job["latitude"], job["longitude"])
+        for facet in self.FACETS:
+            key = self._facet_key(job[facet])
+            self._postings[facet].setdefault(key, set()).add(job_id)
+            self._facet_labels[facet].setdefault(key, job[facet])
+        for sort, sort_key in self.SORT_KEYS.items():
+            value = sort_key(job)
+            self._sort_values[sort][job_id] = value
+            if incremental:
+                bisect.insort(self._orders[sort], (value, job_id))
+        for key in self.RANGE_KEYS:
+            if job.get(key) is not None and incremental:
+                bisect.insort(self._ranges[key], (job[key], job_id))
+
+    def upsert_many(self, jobs):
+        """Insert or replace validated listings (dicts from JobListing.dict())"""
+        jobs = list(jobs)
+        if not jobs:
+            return
+        # Large batches rebuild the orderings once instead of inserting one by one
+        incremental = len(jobs) * 8 < len(self._jobs)
+        for job in jobs:
+            if job["id"] in self._jobs:
+                self._unlink(job["id"], incremental)
+            self._link(job, incremental)
+        if not incremental:
+            for sort, values in self._sort_values.items():
+                self._orders[sort] = sorted((value, job_id) for job_id, value in values.items())
+            for key in self.RANGE_KEYS:
+                self._ranges[key] = sorted((job[key], job_id) for job_id, job in self._jobs.items() if job.get(key) is not None)
+        self._changed()
+
+    def remove_many(self, job_ids):
+        removed = False
+        for job_id in job_ids:
+            if job_id in self._jobs:
+                self._unlink(job_id, incremental=True)
+                removed = True
+        if removed:
+            self._changed()
+
+    def _changed(self):
+        self._revision += 1
+        for listener in self._listeners:
+            listener(self)
+
+    def facet_values(self, facet: str) -> List[str]:
+        return sorted(self._facet_labels[facet].values())
+
+    def jobs_by_facet(self, facet: str) -> Dict[str, List[Dict[str, Any]]]:
+        grouped = {}
+        for job_id, _ in self._orders["posted_date"][::-1]:
+            job = self._jobs[job_id]
+            grouped.setdefault(job[facet], []).append(job)
+        return grouped
+
+    def candidates(self, filters: Dict[str, Optional[List[str]]]):
+        """Ids matching every facet filter (any of the values within a facet), or None for no filtering"""
+        result = None
+        for facet, values in filters.items():
+            if not values:
+                continue
+            matched = set()
+            for value in values:
+                matched |= self._postings[facet].get(self._facet_key(value), set())
+            result = matched if result is None else result & matched
+            if not result:
+                return set()
+        return result
+
+    def salary_candidates(self, salary_min: Optional[float] = None, salary_max: Optional[float] = None):
+        """Ids whose advertised range overlaps [salary_min, salary_max], or None for no filtering"""
+        result = None
+        if salary_min is not None:
+            # Pays at least salary_min somewhere in its range
+            bounds = self._ranges["salary_max"]
+            result = {job_id for _, job_id in bounds[bisect.bisect_left(bounds, (salary_min, "")):]}
+        if salary_max is not None:
+            bounds = self._ranges["salary_min"]
+            matched = {job_id for _, job_id in bounds[:bisect.bisect_right(bounds, (salary_max, "\uffff"))]}
+            result = matched if result is None else result & matched
+        return result
+
+    @staticmethod
+    def encode_cursor(sort: str, order: str, value: float, job_id: str) -> str:
+        raw = json.dumps([sort, order, value, job_id], separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(cursor: str, sort: str, order: str):
+        try:
+            cursor_sort, cursor_order, value, job_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not isinstance(job_id, str):
+                raise TypeError("Cursor position has the wrong type")
+            value = float(value)
+        except (ValueError, TypeError):
+            raise ValueError("Malformed cursor")
+        if cursor_sort != sort or cursor_order != order:
+            raise ValueError("Cursor does not match the requested sort order")
+        return (value, job_id)
+
+    def query(self, filters, sort: str = "posted_date", order: str = "desc", limit: int = 50, cursor: Optional[str] = None, candidates=None, distances=None):
+        """Return (page, total, next_cursor) for the filtered listings in the requested order
+
+        sort="distance" orders by the per-query distances from a geo lookup; candidates must be within them.
+        """
+        if candidates is None:
+            candidates = self.candidates(filters)
+        descending = order == "desc"
+        if sort == "distance":
+            entries = sorted((distances[job_id], job_id) for job_id in candidates)
+        elif candidates is not None and len(candidates) * 8 < len(self._jobs):
+            # Selective filters: sorting the few matches beats walking the full ordering
+            values = self._sort_values[sort]
+            entries = sorted((values[job_id], job_id) for job_id in candidates)
+        else:
+            entries = self._orders[sort]
+        
+        if descending:
+            position = len(entries) - 1 if cursor is None else bisect.bisect_left(entries, self.decode_cursor(cursor, sort, order)) - 1
+            step, stop = -1, -1
+        else:
+            position = 0 if cursor is None else bisect.bisect_right(entries, self.decode_cursor(cursor, sort, order))
+            step, stop = 1, len(entries)
+        
+        page = []
+        last_entry = None
+        while position != stop and len(page) < limit:
+            entry = entries[position]
+            if candidates is None or entry[1] in candidates:
+                page.append(self._jobs[entry[1]])
+                last_entry = entry
+            position += step
+        
+        has_more = False
+        while position != stop:
+            if candidates is None or entries[position][1] in candidates:
+                has_more = True
+                break
+            position += step
+        
+        next_cursor = self.encode_cursor(sort, order, *last_entry) if has_more and last_entry else None
+        total = len(self._jobs) if candidates is None else len(candidates)
+        return page, total, next_cursor
+
+def job_listing_id(record: Dict[str, Any]) -> str:
+    # Feeds rarely carry our ids; derive a stable one so re-imports update instead of duplicating
+    natural_key = "|".join(str(record.get(field, "")) for field in ("company", "title", "location", "application_url"))
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, natural_key))
+
+job_index = JobIndex()
+# Sample jobs get the same natural-key ids as imports so saved jobs survive a restart
+job_index.upsert_many(JobListing(**job_data, id=job_listing_id(job_data)).dict() for job_data in SAMPLE_JOBS)
+
+def build_featured_jobs():
+    # Top 3 most recent jobs
+    page, _, _ = job_index.query({}, sort="posted_date", order="desc", limit=3)
+    return {"featured_jobs": page}
+
+static_catalog.register("featured_jobs", build_featured_jobs)
+static_catalog.register("job_categories", lambda: job_index.jobs_by_facet("category"))
+
+def refresh_job_catalogs(index: JobIndex):
+    static_catalog.invalidate("featured_jobs")
+    static_catalog.invalidate("job_categories")
+
+job_index.add_listener(refresh_job_catalogs)
+
+# Bulk job ingestion: partner feeds are streamed, validated and upserted batch by batch
+JOB_IMPORT_BATCH_SIZE = int(os.environ.get('JOB_IMPORT_BATCH_SIZE', '500'))
+JOB_IMPORT_MAX_REPORTED_ERRORS = 50
+JOB_IMPORT_FORMATS = ("jsonl", "csv")
+JOB_LIST_FIELDS = ("requirements", "benefits")
+
+async def iter_text_lines(chunks):
+    """Split an async stream of byte chunks into text lines without buffering the whole body"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+async def iter_job_records(lines, file_format: str):
+    """Yield (line_number, record or error message) from JSONL or CSV lines"""
+    if file_format == "jsonl":
+        line_number = 0
+        async for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, f"Invalid JSON: {e}"
+                continue
+            yield line_number, record if isinstance(record, dict) else "Expected a JSON object"
+        return
+    
+    header = None
+    logical_line = ""
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        logical_line = f"{logical_line}\n{line}" if logical_line else line
+        # A quoted field may span physical lines; wait until the quotes balance
+        if logical_line.count('"') % 2:
+            continue
+        row, logical_line = next(csv.reader([logical_line]), []), ""
+        if not row:
+            continue
+        if header is None:
+            header = [column.strip() for column in row]
             continue
-        if job_type and job.job_type != job_type:
+        record = {column: value for column, value in zip(header, row) if value != ""}
+        for field in JOB_LIST_FIELDS:
+            if field in record:
+                record[field] = [part.strip() for part in record[field].split("|") if part.strip()]
+        yield line_number, record
+
+async def import_job_records(records, batch_size: int = JOB_IMPORT_BATCH_SIZE):
+    """Validate, upsert and index job records in batches; returns an import report"""
+    report = {"received": 0, "imported": 0, "upserted": 0, "modified": 0, "failed": 0, "errors": [], "batches": []}
+    batch = []
+    batch_lines = []
+    started_at = time.perf_counter()
+    
+    def record_error(line_number, error):
+        report["failed"] += 1
+        if len(report["errors"]) < JOB_IMPORT_MAX_REPORTED_ERRORS:
+            report["errors"].append({"line": line_number, "error": error})
+    
+    async def flush():
+        batch_started_at = time.perf_counter()
+        try:
+            result = (await db.jobs.bulk_write(
+                [ReplaceOne({"id": job["id"]}, job, upsert=True) for job in batch], ordered=False
+            )).bulk_api_result
+        except BulkWriteError as e:
+            # Unordered: every op without a write error was applied, so only those reach the index
+            result = e.details
+            write_errors = {error["index"]: error.get("errmsg", "Write failed") for error in result.get("writeErrors", [])}
+            for position in sorted(write_errors):
+                record_error(batch_lines[position], write_errors[position])
+            written = [job for position, job in enumerate(batch) if position not in write_errors]
+        else:
+            written = list(batch)
+        job_index.upsert_many(written)
+        elapsed = time.perf_counter() - batch_started_at
+        report["imported"] += len(written)
+        report["upserted"] += result.get("nUpserted", 0)
+        report["modified"] += result.get("nModified", 0)
+        report["batches"].append({
+            "batch": len(report["batches"]) + 1,
+            "records": len(written),
+            "seconds": round(elapsed, 4),
+            "records_per_second": round(len(batch) / elapsed, 1) if elapsed > 0 else None
+        })
+        logger.info("Imported job batch %s: %s records in %.3fs", len(report["batches"]), len(written), elapsed)
+        batch.clear()
+        batch_lines.clear()
+    
+    async for line_number, record in records:
+        report["received"] += 1
+        try:
+            if isinstance(record, str):
+                raise ValueError(record)
+            record.setdefault("id", job_listing_id(record))
+            batch.append(JobListing(**record).dict())
+            batch_lines.append(line_number)
+        except ValidationError as e:
+            error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+        except ValueError as e:
+            error = str(e)
+        else:
+            if len(batch) >= batch_size:
+                await flush()
+            continue
+        record_error(line_number, error)
+    if batch:
+        await flush()
+    
+    elapsed = time.perf_counter() - started_at
+    report["seconds"] = round(elapsed, 4)
+    report["records_per_second"] = round(report["imported"] / elapsed, 1) if elapsed > 0 else None
+    return report
+
+async def load_job_index_from_db(batch_size: int = JOB_IMPORT_BATCH_SIZE):
+    """Stream previously imported listings from the jobs collection into the in-process index"""
+    loaded = 0
+    skipped = 0
+    batch = []
+    async for job in db.jobs.find({}, {"_id": 0}).batch_size(batch_size):
+        # Re-validate so documents written by older code pick up derived fields such as coordinates
+        try:
+            batch.append(JobListing(**job).dict())
+        except ValidationError as e:
+            skipped += 1
+            logger.warning("Skipping stored job %s: %s", job.get("id"), e.errors()[0]["msg"])
             continue
-        jobs.append(job.dict())
+        if len(batch) >= batch_size:
+            job_index.upsert_many(batch)
+            loaded += len(batch)
+            batch = []
+    if batch:
+        job_index.upsert_many(batch)
+        loaded += len(batch)
+    if skipped:
+        logger.warning("Skipped %s stored job listings that failed validation", skipped)
+    return loaded
+
+@api_router.post("/jobs/import")
+async def import_jobs(
+    request: Request,
+    format: Optional[str] = None,
+    batch_size: int = JOB_IMPORT_BATCH_SIZE,
+    current_user: User = Depends(get_admin_user)
+):
+    file_format = format or ("csv" if "csv" in request.headers.get("content-type", "") else "jsonl")
+    if file_format not in JOB_IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be 'jsonl' or 'csv'")
+    batch_size = min(max(batch_size, 1), 5000)
+    
+    records = iter_job_records(iter_text_lines(request.stream()), file_format)
+    return await import_job_records(records, batch_size=batch_size)
+
+JOB_SORT_ORDERS = ("asc", "desc")
+GEO_DEFAULT_RADIUS_MILES = 25.0
+GEO_MAX_RADIUS_MILES = 12500.0
+
+def resolve_geo_origin(near: Optional[str], lat: Optional[float], lon: Optional[float]):
+    """(lat, lon) from a gazetteer place name or explicit coordinates, or None when no geo filter was asked for"""
+    if near:
+        point = resolve_place(near)
+        if point is None:
+            raise HTTPException(status_code=400, detail=f"Unknown place: {near}")
+        return point
+    if (lat is None) != (lon is None):
+        raise HTTPException(status_code=400, detail="lat and lon must be given together")
+    return (lat, lon) if lat is not None else None
+
+def conditional_json_response(request: Request, etag: str, build_payload):
+    """JSON response tagged with a precomputed ETag; the payload is only built on a cache miss"""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    body = json.dumps(jsonable_encoder(build_payload()), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@api_router.get("/jobs/listings")
+async def get_job_listings(
+    request: Request,
+    category: Optional[List[str]] = Query(None),
+    job_type: Optional[List[str]] = Query(None),
+    location: Optional[List[str]] = Query(None),
+    company: Optional[List[str]] = Query(None),
+    salary_min: Optional[float] = Query(None, ge=0),
+    salary_max: Optional[float] = Query(None, ge=0),
+    near: Optional[str] = None,
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    radius_miles: float = Query(GEO_DEFAULT_RADIUS_MILES, gt=0, le=GEO_MAX_RADIUS_MILES),
+    sort: str = "posted_date",
+    order: str = "desc",
+    limit: int = 50,
+    cursor: Optional[str] = None
+):
+    origin = resolve_geo_origin(near, lat, lon)
+    if sort not in JobIndex.SORT_KEYS and not (sort == "distance" and origin):
+        sort_options = list(JobIndex.SORT_KEYS) + (["distance"] if origin else [])
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(sort_options)}")
+    if order not in JOB_SORT_ORDERS:
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    limit = min(max(limit, 1), 200)
+    if salary_min is not None and salary_max is not None and salary_min > salary_max:
+        raise HTTPException(status_code=400, detail="salary_min must not exceed salary_max")
+    filters = {"category": category, "job_type": job_type, "location": location, "company": company}
+    
+    def build_payload():
+        candidates = job_index.candidates(filters)
+        salary_matches = job_index.salary_candidates(salary_min, salary_max)
+        if salary_matches is not None:
+            candidates = salary_matches if candidates is None else candidates & salary_matches
+        distances = None
+        if origin:
+            distances = job_index.geo.within(*origin, radius_miles)
+            candidates = set(distances) if candidates is None else candidates & distances.keys()
+        try:
+            jobs, total, next_cursor = job_index.query(
+                filters, sort=sort, order=order, limit=limit, cursor=cursor, candidates=candidates, distances=distances
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if distances is not None:
+            jobs = [{**job, "distance_miles": round(distances[job["id"]], 1)} for job in jobs]
+        return {
+            "jobs": jobs,
+            "total": total,
+            "categories": job_index.facet_values("category"),
+            "job_types": job_index.facet_values("job_type"),
+            "next_cursor": next_cursor
+        }
+    
+    # Same index version + same query => same page, so the tag is known without running the query
+    query_digest = hashlib.sha1(str(sorted(request.query_params.multi_items())).encode("utf-8")).hexdigest()[:16]
+    return conditional_json_response(request, f'W/"jobs-{job_index.version}-{query_digest}"', build_payload)
+
+@api_router.get("/jobs/search")
+async def search_jobs(
+    q: str,
+    category: Optional[List[str]] = Query(None),
+    job_type: Optional[List[str]] = Query(None),
+    location: Optional[List[str]] = Query(None),
+    company: Optional[List[str]] = Query(None),
+    limit: int = 20
+):
+    limit = min(max(limit, 1), 100)
+    candidates = job_index.candidates({"category": category, "job_type": job_type, "location": location, "company": company})
+    if candidates is not None and not candidates:
+        ranked, total_matches = [], 0
+    else:
+        ranked, total_matches = job_index.text.search(q, limit=limit, candidates=candidates)
     
     return {
-        "jobs": jobs,
-        "total": len(jobs),
-        "categories": list(set([job["category"] for job in [JobListing(**j).dict() for j in SAMPLE_JOBS]])),
-        "job_types": list(set([job["job_type"] for job in [JobListing(**j).dict() for j in SAMPLE_JOBS]]))
+        "query": q,
+        "results": [{**job_index.get(job_id), "score": round(score, 4)} for job_id, score in ranked],
+        "total_matches": total_matches
+    }
+
+# Job recommendations: TF-IDF similarity between a user's job profile and every listing
+RECOMMENDATION_CACHE_SIZE = int(os.environ.get('RECOMMENDATION_CACHE_SIZE', '1024'))
+RECOMMENDATION_CACHE_TTL_SECONDS = float(os.environ.get('RECOMMENDATION_CACHE_TTL_SECONDS', '600'))
+RECOMMENDATION_MAX_RESULTS = 50
+RECOMMENDATION_SKILL_WEIGHT = 3
+RECOMMENDATION_CATEGORY_BONUS = 0.25
+recommendation_cache = TTLCache(RECOMMENDATION_CACHE_SIZE, RECOMMENDATION_CACHE_TTL_SECONDS)
+
+def profile_term_weights(profile: JobProfile) -> Dict[str, float]:
+    """Skills plus the terms of every saved listing, as a weighted bag of terms"""
+    weights = {}
+    for skill in profile.skills:
+        for token in tokenize_text(skill):
+            weights[token] = weights.get(token, 0) + RECOMMENDATION_SKILL_WEIGHT
+    for job_id in profile.saved_jobs:
+        for term, freq in job_index.text.term_frequencies(job_id).items():
+            weights[term] = weights.get(term, 0) + freq
+    return weights
+
+def recommend_jobs(profile: JobProfile, limit: int = RECOMMENDATION_MAX_RESULTS):
+    preferred = job_index.candidates({"category": profile.preferred_categories})
+    ranked = job_index.text.similar(
+        profile_term_weights(profile),
+        limit=limit,
+        exclude=profile.saved_jobs,
+        bonus_ids=preferred or (),
+        bonus=RECOMMENDATION_CATEGORY_BONUS
+    )
+    if not ranked:
+        # Nothing to match on yet: newest listings first
+        newest, _, _ = job_index.query({}, sort="posted_date", order="desc", limit=limit)
+        return [(job, 0.0) for job in newest]
+    return [(job_index.get(job_id), score) for job_id, score in ranked]
+
+@api_router.get("/jobs/profile")
+async def get_job_profile(current_user: User = Depends(get_current_user)):
+    return current_user.job_profile
+
+@api_router.put("/jobs/profile")
+async def update_job_profile(profile: JobProfile, current_user: User = Depends(get_current_user)):
+    await db.users.update_one({"id": current_user.id}, {"$set": {"job_profile": profile.dict()}})
+    principal_cache.invalidate(current_user.username)
+    recommendation_cache.invalidate(current_user.id)
+    return profile
+
+@api_router.get("/jobs/recommended")
+async def get_recommended_jobs(limit: int = Query(10, ge=1, le=RECOMMENDATION_MAX_RESULTS), current_user: User = Depends(get_current_user)):
+    # Entries carry the catalog version and profile they were computed for, so stale ones are recomputed
+    profile = current_user.job_profile
+    stamp = (job_index.version, profile.json())
+    cached = recommendation_cache.get(current_user.id)
+    if cached is None or cached[0] != stamp:
+        cached = (stamp, recommend_jobs(profile))
+        recommendation_cache.set(current_user.id, cached)
+    ranked = cached[1][:limit]
+    return {
+        "jobs": [{**job, "relevance": round(score, 4)} for job, score in ranked],
+        "total": len(ranked),
+        "profile": profile
     }
 
 @api_router.get("/jobs/featured")
-async def get_featured_jobs():
-    # Return top 3 most recent jobs
-    featured = sorted(SAMPLE_JOBS, key=lambda x: x["posted_date"], reverse=True)[:3]
-    return {"featured_jobs": [JobListing(**job).dict() for job in featured]}
+async def get_featured_jobs(request: Request):
+    return static_catalog.respond(request, "featured_jobs")
 
 @api_router.get("/jobs/categories")
-async def get_job_categories():
-    categories = {}
-    for job_data in SAMPLE_JOBS:
-        job = JobListing(**job_data)
-        if job.category not in categories:
-            categories[job.category] = []
-        categories[job.category].append(job.dict())
-    
-    return categories
+async def get_job_categories(request: Request):
+    return static_catalog.respond(request, "job_categories")
 
 # Visa requirements endpoints
+VISA_REQUIREMENT_MODELS = [VisaRequirement(**req).dict() for req in VISA_REQUIREMENTS]
+VISA_REQUIREMENTS_BY_SLUG = {req["visa_type"].lower().replace(" ", "-"): req for req in VISA_REQUIREMENT_MODELS}
+
+static_catalog.register("visa_requirements", lambda: {"visa_types": VISA_REQUIREMENT_MODELS})
+for visa_slug, visa_requirement in VISA_REQUIREMENTS_BY_SLUG.items():
+    static_catalog.register(f"visa_requirements:{visa_slug}", lambda requirement=visa_requirement: requirement)
+
 @api_router.get("/visa/requirements")
-async def get_visa_requirements():
-    return {"visa_types": [VisaRequirement(**req).dict() for req in VISA_REQUIREMENTS]}
+async def get_visa_requirements(request: Request):
+    return static_catalog.respond(request, "visa_requirements")
 
 @api_router.get("/visa/requirements/{visa_type}")
-async def get_visa_requirement_details(visa_type: str):
-    for req in VISA_REQUIREMENTS:
-        if req["visa_type"].lower().replace(" ", "-") == visa_type.lower():
-            return VisaRequirement(**req).dict()
-    raise HTTPException(status_code=404, detail="Visa type not found")
+async def get_visa_requirement_details(visa_type: str, request: Request):
+    visa_slug = visa_type.lower()
+    if visa_slug not in VISA_REQUIREMENTS_BY_SLUG:
+        raise HTTPException(status_code=404, detail="Visa type not found")
+    return static_catalog.respond(request, f"visa_requirements:{visa_slug}")
+
+# Visa document checklist
+VISA_CHECKLIST = {
+    "general_documents": [
+        "Valid passport (6+ months remaining)",
+        "Passport-style photographs",
+        "Completed visa application form",
+        "Visa application fee payment",
+        "Biometric information"
+    ],
+    "financial_documents": [
+        "Bank statements (6 months)",
+        "Salary slips or employment letter",
+        "Tax returns",
+        "Sponsor financial documents (if applicable)"
+    ],
+    "identity_documents": [
+        "Birth certificate",
+        "Marriage certificate (if applicable)",
+        "Previous passports",
+        "Police clearance certificate"
+    ],
+    "supporting_documents": [
+        "TB test results (if required)",
+        "English language test certificate",
+        "Academic qualifications",
+        "Employment contracts or job offers"
+    ]
+}
+static_catalog.register("visa_checklist", lambda: VISA_CHECKLIST)
 
 @api_router.get("/visa/checklist")
-async def get_visa_checklist():
-    return {
-        "general_documents": [
-            "Valid passport (6+ months remaining)",
-            "Passport-style photographs",
-            "Completed visa application form",
-            "Visa application fee payment",
-            "Biometric information"
-        ],
-        "financial_documents": [
-            "Bank statements (6 months)",
-            "Salary slips or employment letter",
-            "Tax returns",
-            "Sponsor financial documents (if applicable)"
-        ],
-        "identity_documents": [
-            "Birth certificate",
-            "Marriage certificate (if applicable)",
-            "Previous passports",
-            "Police clearance certificate"
-        ],
-        "supporting_documents": [
-            "TB test results (if required)",
-            "English language test certificate",
-            "Academic qualifications",
-            "Employment contracts or job offers"
-        ]
-    }
+async def get_visa_checklist(request: Request):
+    return static_catalog.respond(request, "visa_checklist")
 
 # Timeline and Progress endpoints
 @api_router.get("/timeline/full")
 async def get_full_timeline(current_user: User = Depends(get_current_user)):
-    user_completed_steps = current_user.completed_steps
-    timeline_with_status = []
-    
-    for step in RELOCATION_TIMELINE:
-        step_copy = step.copy()
-        step_copy["is_completed"] = step["id"] in user_completed_steps
-        timeline_with_status.append(step_copy)
+    completed_mask = timeline_graph.completion_mask(current_user.completed_steps)
+    completed_count = timeline_graph.completed_count(completed_mask)
     
     return {
-        "timeline": timeline_with_status,
+        "timeline": timeline_graph.overlay(completed_mask),
         "total_steps": len(RELOCATION_TIMELINE),
-        "completed_steps": len(user_completed_steps),
-        "completion_percentage": (len(user_completed_steps) / len(RELOCATION_TIMELINE)) * 100,
-        "current_phase": get_current_phase(user_completed_steps)
+        "completed_steps": completed_count,
+        "completion_percentage": (completed_count / len(RELOCATION_TIMELINE)) * 100,
+        "current_phase": timeline_graph.current_phase(completed_mask)
     }
 
 @api_router.get("/timeline/by-category")
 async def get_timeline_by_category(current_user: User = Depends(get_current_user)):
-    user_completed_steps = current_user.completed_steps
+    completed_mask = timeline_graph.completion_mask(current_user.completed_steps)
     categories = {}
     
-    for step in RELOCATION_TIMELINE:
-        category = step["category"]
-        if category not in categories:
-            categories[category] = {
-                "name": category,
-                "steps": [],
-                "total_steps": 0,
-                "completed_steps": 0
-            }
-        
-        step_copy = step.copy()
-        step_copy["is_completed"] = step["id"] in user_completed_steps
-        categories[category]["steps"].append(step_copy)
-        categories[category]["total_steps"] += 1
-        
-        if step["id"] in user_completed_steps:
-            categories[category]["completed_steps"] += 1
-    
-    # Calculate completion percentage for each category
-    for category in categories.values():
-        if category["total_steps"] > 0:
-            category["completion_percentage"] = (category["completed_steps"] / category["total_steps"]) * 100
-        else:
-            category["completion_percentage"] = 0
+    for category, indices in timeline_graph.category_indices.items():
+        completed_count = timeline_graph.completed_count(completed_mask, timeline_graph.category_masks[category])
+        categories[category] = {
+            "name": category,
+            "steps": timeline_graph.overlay(completed_mask, indices),
+            "total_steps": len(indices),
+            "completed_steps": completed_count,
+            "completion_percentage": (completed_count / len(indices)) * 100
+        }
     
     return categories
 
 @api_router.post("/timeline/update-progress")
 async def update_step_progress(progress: TimelineProgressUpdate, current_user: User = Depends(get_current_user)):
-    user_completed_steps = current_user.completed_steps.copy()
-    
-    if progress.completed and progress.step_id not in user_completed_steps:
-        user_completed_steps.append(progress.step_id)
-    elif not progress.completed and progress.step_id in user_completed_steps:
-        user_completed_steps.remove(progress.step_id)
-    
-    # Update user in database
-    await db.users.update_one(
-        {"username": current_user.username},
-        {"$set": {"completed_steps": user_completed_steps}}
+    # Atomic set add/remove on the server, so concurrent toggles never overwrite each other
+    if progress.completed:
+        update = {"$addToSet": {"completed_steps": progress.step_id}}
+    else:
+        update = {"$pull": {"completed_steps": progress.step_id}}
+    updated_user = await db.users.find_one_and_update(
+        {"username": current_user.username}, update, return_document=ReturnDocument.AFTER
     )
+    if updated_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    current_user = User(**updated_user)
+    principal_cache.set(current_user.username, current_user)
+    
+    completed_mask = timeline_graph.completion_mask(current_user.completed_steps)
+    step_index = timeline_graph.index_of.get(progress.step_id)
+    if step_index is not None:
+        # Derive the new schedule incrementally from the one for the previous state
+        timeline_graph.schedule(completed_mask, previous_mask=completed_mask ^ (1 << step_index))
+    completed_count = timeline_graph.completed_count(completed_mask)
     
     # Log progress update
-    await db.progress_logs.insert_one({
+    await progress_log_buffer.put({
         "user_id": current_user.id,
         "step_id": progress.step_id,
         "completed": progress.completed,
@@ -1046,158 +2681,308 @@ async def update_step_progress(progress: TimelineProgressUpdate, current_user: U
         "timestamp": datetime.utcnow()
     })
     
+    event_hub.publish(current_user.id, "timeline.step", {
+        "step_id": progress.step_id,
+        "completed": progress.completed,
+        "total_completed": completed_count,
+        "current_phase": timeline_graph.current_phase(completed_mask)
+    })
+    
     return {
         "message": "Progress updated successfully",
-        "total_completed": len(user_completed_steps),
-        "completion_percentage": (len(user_completed_steps) / len(RELOCATION_TIMELINE)) * 100
+        "total_completed": completed_count,
+        "completion_percentage": (completed_count / len(RELOCATION_TIMELINE)) * 100
     }
 
-def get_current_phase(completed_steps):
-    """Determine current phase based on completed steps"""
-    if not completed_steps:
-        return "Planning"
-    
-    max_completed = max(completed_steps)
-    
-    if max_completed <= 3:
-        return "Planning"
-    elif max_completed <= 7:
-        return "Visa & Legal"
-    elif max_completed <= 11:
-        return "Employment"
-    elif max_completed <= 15:
-        return "Housing"
-    elif max_completed <= 19:
-        return "Financial"
-    elif max_completed <= 23:
-        return "Logistics"
-    elif max_completed <= 26:
-        return "US Exit"
-    elif max_completed <= 30:
-        return "UK Arrival"
-    else:
-        return "Settlement"
-
-# Resources and Links endpoints
-@api_router.get("/resources/all")
-async def get_all_resources():
+@api_router.get("/timeline/next-steps")
+async def get_next_steps(current_user: User = Depends(get_current_user)):
+    completed_mask = timeline_graph.completion_mask(current_user.completed_steps)
+    ready_mask = timeline_graph.unblocked_mask(completed_mask)
+    open_mask = timeline_graph.all_mask & ~completed_mask
+    
+    next_steps = []
+    for index in timeline_graph.order:
+        if ready_mask >> index & 1:
+            step = timeline_graph.steps[index]
+            next_steps.append({**step, "is_completed": False, "unlocks": timeline_graph.unlocked_by(index, completed_mask)})
+    
     return {
-        "visa_legal": [
-            {"name": "UK Government Visa Guide", "url": "https://www.gov.uk/browse/visas-immigration", "description": "Official UK visa information"},
-            {"name": "Immigration Lawyer Directory", "url": "https://www.lawsociety.org.uk", "description": "Find qualified immigration lawyers"},
-            {"name": "Document Apostille Services", "url": "https://www.gov.uk/get-document-legalised", "description": "Document legalization services"},
-            {"name": "Visa Application Centre", "url": "https://www.vfsglobal.co.uk", "description": "UK visa application centres"}
-        ],
-        "housing": [
-            {"name": "Rightmove", "url": "https://www.rightmove.co.uk", "description": "UK's largest property portal"},
-            {"name": "Zoopla", "url": "https://www.zoopla.co.uk", "description": "Property search and valuation"},
-            {"name": "SpareRoom", "url": "https://www.spareroom.co.uk", "description": "Room rental and flatshare platform"},
-            {"name": "Peak District Property", "url": "https://www.peakdistrictproperty.co.uk", "description": "Local estate agents in Peak District"}
-        ],
-        "employment": [
-            {"name": "Indeed UK", "url": "https://uk.indeed.com", "description": "Job search platform"},
-            {"name": "Reed", "url": "https://www.reed.co.uk", "description": "UK recruitment website"},
-            {"name": "LinkedIn UK", "url": "https://www.linkedin.com/jobs", "description": "Professional networking and jobs"},
-            {"name": "Peak District Jobs", "url": "https://www.peakdistrictjobs.co.uk", "description": "Local job opportunities"}
-        ],
-        "financial": [
-            {"name": "Monzo", "url": "https://monzo.com", "description": "Digital bank popular with expats"},
-            {"name": "Wise", "url": "https://wise.com", "description": "International money transfers"},
-            {"name": "HMRC", "url": "https://www.gov.uk/government/organisations/hm-revenue-customs", "description": "UK tax authority"},
-            {"name": "NHS Registration", "url": "https://www.nhs.uk/using-the-nhs/nhs-services/gps/how-to-register-with-a-gp-practice/", "description": "Healthcare registration"}
-        ],
-        "local_services": [
-            {"name": "Peak District National Park", "url": "https://www.peakdistrict.gov.uk", "description": "Official park information"},
-            {"name": "Derbyshire County Council", "url": "https://www.derbyshire.gov.uk", "description": "Local government services"},
-            {"name": "Peak District Chamber", "url": "https://www.peakdistrictchamber.co.uk", "description": "Business networking"},
-            {"name": "Local Community Groups", "url": "https://www.facebook.com/groups/peakdistrictexpats", "description": "Expat community support"}
-        ],
-        "lifestyle": [
-            {"name": "Visit Peak District", "url": "https://www.visitpeakdistrict.com", "description": "Tourism and attractions"},
-            {"name": "Peak District Weather", "url": "https://www.metoffice.gov.uk", "description": "Weather forecasts"},
-            {"name": "Public Transport", "url": "https://www.travelsouthyorkshire.com", "description": "Local transport information"},
-            {"name": "Healthcare Finder", "url": "https://www.nhs.uk/service-search", "description": "Find local healthcare services"}
-        ]
+        "next_steps": next_steps,
+        "ready_count": len(next_steps),
+        "blocked_count": bin(open_mask & ~ready_mask).count("1"),
+        "completed_count": bin(completed_mask & timeline_graph.all_mask).count("1")
     }
 
-# Progress tracking endpoints
-@api_router.get("/progress/items")
-async def get_progress_items(current_user: User = Depends(get_current_user), category: Optional[str] = None, status: Optional[str] = None):
-    # Initialize progress items for user if they don't exist
-    existing_items = await db.progress_items.find({"user_id": current_user.id}).to_list(length=None)
-    
-    if not existing_items:
-        # Create initial progress items for user
-        initial_items = []
-        for item_data in SAMPLE_PROGRESS_ITEMS:
-            item = ProgressItem(user_id=current_user.id, **item_data)
-            item_dict = item.dict()
-            # Ensure datetime objects are properly handled
-            for key, value in item_dict.items():
-                if isinstance(value, datetime):
-                    item_dict[key] = value.isoformat()
-            initial_items.append(item_dict)
-        
-        if initial_items:
-            await db.progress_items.insert_many(initial_items)
-            # Fetch the newly created items
-            existing_items = await db.progress_items.find({"user_id": current_user.id}).to_list(length=None)
-    
-    # Convert MongoDB documents to dict and handle ObjectId
-    serialized_items = []
-    for item in existing_items:
-        # Convert MongoDB document to dict and handle ObjectId
-        item_dict = dict(item)
-        if "_id" in item_dict:
-            del item_dict["_id"]  # Remove MongoDB ObjectId
-        
-        # Ensure datetime fields are serializable
-        for key, value in item_dict.items():
-            if isinstance(value, datetime):
-                item_dict[key] = value.isoformat()
-        
-        serialized_items.append(item_dict)
+FORECAST_DISTRIBUTIONS = ("triangular", "lognormal", "uniform")
+
+@api_router.get("/timeline/forecast")
+async def get_timeline_forecast(
+    start_date: Optional[date] = None,
+    trials: int = Query(10000, ge=1000, le=50000),
+    distribution: str = "triangular",
+    spread: float = Query(0.5, ge=0, le=2, allow_inf_nan=False),
+    current_user: User = Depends(get_current_user)
+):
+    if distribution not in FORECAST_DISTRIBUTIONS:
+        raise HTTPException(status_code=400, detail=f"distribution must be one of: {', '.join(FORECAST_DISTRIBUTIONS)}")
+    start_date = start_date or datetime.utcnow().date()
+    completed_mask = timeline_graph.completion_mask(current_user.completed_steps)
+    forecast = await timeline_graph.forecast(
+        forecast_pool, completed_mask, trials=trials, distribution=distribution, spread=spread
+    )
+    
+    steps = [
+        {
+            "id": step["id"],
+            "title": step["title"],
+            "category": step["category"],
+            "criticality": round(forecast["criticality"][step["id"]], 4)
+        }
+        for step in RELOCATION_TIMELINE
+    ]
+    steps.sort(key=lambda step: step["criticality"], reverse=True)
+    
+    return {
+        "start_date": start_date,
+        "p50_completion": start_date + timedelta(days=math.ceil(forecast["p50_days"])),
+        "p90_completion": start_date + timedelta(days=math.ceil(forecast["p90_days"])),
+        "deterministic_completion": start_date + timedelta(days=forecast["deterministic_days"]),
+        "probability_on_deterministic_date": round(forecast["probability_by_deterministic"], 4),
+        "days": {
+            "mean": round(forecast["mean_days"], 1),
+            "p10": round(forecast["p10_days"], 1),
+            "p50": round(forecast["p50_days"], 1),
+            "p90": round(forecast["p90_days"], 1)
+        },
+        "trials": trials,
+        "distribution": distribution,
+        "spread": spread,
+        "timeline_version": timeline_graph.version,
+        "step_criticality": steps
+    }
+
+@api_router.get("/timeline/schedule")
+async def get_timeline_schedule(start_date: Optional[date] = None, current_user: User = Depends(get_current_user)):
+    start_date = start_date or datetime.utcnow().date()
+    completed_mask = timeline_graph.completion_mask(current_user.completed_steps)
+    schedule = timeline_graph.schedule(completed_mask)
+    critical_steps = set(schedule["critical_path"])
+    
+    steps = []
+    for index in timeline_graph.order:
+        step = timeline_graph.steps[index]
+        steps.append({
+            "id": step["id"],
+            "title": step["title"],
+            "category": step["category"],
+            "dependencies": step["dependencies"],
+            "is_completed": bool(completed_mask >> index & 1),
+            "remaining_days": schedule["durations"][index],
+            "earliest_start": start_date + timedelta(days=schedule["earliest_start"][index]),
+            "earliest_finish": start_date + timedelta(days=schedule["earliest_finish"][index]),
+            "latest_start": start_date + timedelta(days=schedule["latest_finish"][index] - schedule["durations"][index]),
+            "latest_finish": start_date + timedelta(days=schedule["latest_finish"][index]),
+            "slack_days": schedule["slack"][index],
+            "is_critical": step["id"] in critical_steps
+        })
     
-    # Filter by category and status if provided
-    filtered_items = serialized_items
+    return {
+        "start_date": start_date,
+        "projected_completion": start_date + timedelta(days=schedule["project_duration"]),
+        "remaining_days": schedule["project_duration"],
+        "critical_path": schedule["critical_path"],
+        "timeline_version": timeline_graph.version,
+        "steps": steps
+    }
+
+# Resources and Links endpoints
+# Curated relocation resources and links
+RELOCATION_RESOURCES = {
+    "visa_legal": [
+        {"name": "UK Government Visa Guide", "url": "https://www.gov.uk/browse/visas-immigration", "description": "Official UK visa information"},
+        {"name": "Immigration Lawyer Directory", "url": "https://www.lawsociety.org.uk", "description": "Find qualified immigration lawyers"},
+        {"name": "Document Apostille Services", "url": "https://www.gov.uk/get-document-legalised", "description": "Document legalization services"},
+        {"name": "Visa Application Centre", "url": "https://www.vfsglobal.co.uk", "description": "UK visa application centres"}
+    ],
+    "housing": [
+        {"name": "Rightmove", "url": "https://www.rightmove.co.uk", "description": "UK's largest property portal"},
+        {"name": "Zoopla", "url": "https://www.zoopla.co.uk", "description": "Property search and valuation"},
+        {"name": "SpareRoom", "url": "https://www.spareroom.co.uk", "description": "Room rental and flatshare platform"},
+        {"name": "Peak District Property", "url": "https://www.peakdistrictproperty.co.uk", "description": "Local estate agents in Peak District"}
+    ],
+    "employment": [
+        {"name": "Indeed UK", "url": "https://uk.indeed.com", "description": "Job search platform"},
+        {"name": "Reed", "url": "https://www.reed.co.uk", "description": "UK recruitment website"},
+        {"name": "LinkedIn UK", "url": "https://www.linkedin.com/jobs", "description": "Professional networking and jobs"},
+        {"name": "Peak District Jobs", "url": "https://www.peakdistrictjobs.co.uk", "description": "Local job opportunities"}
+    ],
+    "financial": [
+        {"name": "Monzo", "url": "https://monzo.com", "description": "Digital bank popular with expats"},
+        {"name": "Wise", "url": "https://wise.com", "description": "International money transfers"},
+        {"name": "HMRC", "url": "https://www.gov.uk/government/organisations/hm-revenue-customs", "description": "UK tax authority"},
+        {"name": "NHS Registration", "url": "https://www.nhs.uk/using-the-nhs/nhs-services/gps/how-to-register-with-a-gp-practice/", "description": "Healthcare registration"}
+    ],
+    "local_services": [
+        {"name": "Peak District National Park", "url": "https://www.peakdistrict.gov.uk", "description": "Official park information"},
+        {"name": "Derbyshire County Council", "url": "https://www.derbyshire.gov.uk", "description": "Local government services"},
+        {"name": "Peak District Chamber", "url": "https://www.peakdistrictchamber.co.uk", "description": "Business networking"},
+        {"name": "Local Community Groups", "url": "https://www.facebook.com/groups/peakdistrictexpats", "description": "Expat community support"}
+    ],
+    "lifestyle": [
+        {"name": "Visit Peak District", "url": "https://www.visitpeakdistrict.com", "description": "Tourism and attractions"},
+        {"name": "Peak District Weather", "url": "https://www.metoffice.gov.uk", "description": "Weather forecasts"},
+        {"name": "Public Transport", "url": "https://www.travelsouthyorkshire.com", "description": "Local transport information"},
+        {"name": "Healthcare Finder", "url": "https://www.nhs.uk/service-search", "description": "Find local healthcare services"}
+    ]
+}
+static_catalog.register("relocation_resources", lambda: RELOCATION_RESOURCES)
+
+@api_router.get("/resources/all")
+async def get_all_resources(request: Request):
+    return static_catalog.respond(request, "relocation_resources")
+
+# Progress tracking endpoints
+PROGRESS_STATUSES = ["not_started", "in_progress", "completed", "blocked"]
+
+# Fields returned to clients for a progress item (Mongo _id and the owner id are never needed)
+PROGRESS_ITEM_PROJECTION = {"_id": 0, "user_id": 0}
+
+# Sample items are validated once; seeding only stamps the owner, a deterministic id and timestamps
+PROGRESS_ITEM_TEMPLATES = [
+    ProgressItem(user_id="", **item_data).dict(exclude={"id", "user_id", "created_at", "updated_at"})
+    for item_data in SAMPLE_PROGRESS_ITEMS
+]
+
+def progress_template_item_id(user_id: str, template_index: int) -> str:
+    # Same user + same template => same id, so repeated or concurrent seeding upserts instead of duplicating
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"progress-item-template|{user_id}|{template_index}"))
+
+async def seed_sample_progress_items(user_id: str) -> int:
+    """Idempotently upsert the sample progress items for a user and mark the user as seeded"""
+    # Dates are stored as native BSON dates so they can be range-queried
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne(
+            {"user_id": user_id, "id": progress_template_item_id(user_id, template_index)},
+            {"$setOnInsert": {**template, "created_at": now, "updated_at": now}},
+            upsert=True
+        )
+        for template_index, template in enumerate(PROGRESS_ITEM_TEMPLATES)
+    ]
+    inserted = 0
+    if operations:
+        try:
+            inserted = (await db.progress_items.bulk_write(operations, ordered=False)).upserted_count
+        except BulkWriteError as e:
+            # A concurrent seed won the race for some ids; anything but a duplicate key is a real failure
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+            inserted = e.details.get("nUpserted", 0)
+    await db.users.update_one({"id": user_id}, {"$set": {"progress_seeded": True}})
+    return inserted
+
+async def ensure_progress_seeded(user: User):
+    # Accounts that predate seeding at creation are seeded on their first progress read
+    if not user.progress_seeded:
+        await seed_sample_progress_items(user.id)
+        user.progress_seeded = True
+
+def build_progress_items_pipeline(user_id: str, category: Optional[str] = None, status: Optional[str] = None):
+    """Filtered items plus whole-list statistics for a user in a single $facet aggregation"""
+    item_filter = {}
     if category:
-        filtered_items = [item for item in filtered_items if item.get("category") == category]
+        item_filter["category"] = category
     if status:
-        filtered_items = [item for item in filtered_items if item.get("status") == status]
+        item_filter["status"] = status
+    
+    items_stages = [{"$match": item_filter}] if item_filter else []
+    items_stages.append({"$project": PROGRESS_ITEM_PROJECTION})
+    
+    return [
+        {"$match": {"user_id": user_id}},
+        {"$facet": {
+            "items": items_stages,
+            "statistics": [
+                {"$group": {
+                    "_id": None,
+                    "total": {"$sum": 1},
+                    "completed": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}},
+                    "in_progress": {"$sum": {"$cond": [{"$eq": ["$status", "in_progress"]}, 1, 0]}},
+                    "categories": {"$addToSet": "$category"}
+                }}
+            ]
+        }}
+    ]
+
+@api_router.get("/progress/items")
+async def get_progress_items(current_user: User = Depends(get_current_user), category: Optional[str] = None, status: Optional[str] = None):
+    await ensure_progress_seeded(current_user)
+    pipeline = build_progress_items_pipeline(current_user.id, category, status)
+    result = (await db.progress_items.aggregate(pipeline).to_list(length=1))[0]
     
-    # Calculate statistics
-    total_items = len(serialized_items)
-    completed_items = len([item for item in serialized_items if item.get("status") == "completed"])
-    in_progress_items = len([item for item in serialized_items if item.get("status") == "in_progress"])
+    statistics = result["statistics"][0] if result["statistics"] else {"total": 0, "completed": 0, "in_progress": 0, "categories": []}
+    total_items = statistics["total"]
+    completed_items = statistics["completed"]
     
     return {
-        "items": filtered_items,
+        "items": result["items"],
         "statistics": {
             "total": total_items,
             "completed": completed_items,
-            "in_progress": in_progress_items,
+            "in_progress": statistics["in_progress"],
             "completion_percentage": (completed_items / total_items * 100) if total_items > 0 else 0
         },
-        "categories": list(set([item.get("category") for item in serialized_items])),
-        "statuses": ["not_started", "in_progress", "completed", "blocked"]
+        "categories": statistics["categories"],
+        "statuses": PROGRESS_STATUSES
     }
 
-@api_router.put("/progress/items/{item_id}")
-async def update_progress_item(item_id: str, update_data: ProgressUpdate, current_user: User = Depends(get_current_user)):
-    # Find the item
-    existing_item = await db.progress_items.find_one({"id": item_id, "user_id": current_user.id})
-    if not existing_item:
-        raise HTTPException(status_code=404, detail="Progress item not found")
+# Progress item writes are single find_one_and_update calls guarded by the item version
+NEXT_PROGRESS_ITEM_VERSION = {"$add": [{"$ifNull": ["$version", 1]}, 1]}
+
+def progress_item_etag(item: Dict[str, Any]) -> str:
+    return f'"{item.get("version", 1)}"'
+
+def if_match_versions(request: Request) -> Optional[List[int]]:
+    """Versions accepted by the If-Match header, or None when any version may be overwritten"""
+    header = request.headers.get("if-match")
+    if header is None or header.strip() == "*":
+        return None
+    # Weak validators never satisfy If-Match
+    versions = [
+        int(tag.strip().strip('"')) for tag in header.split(",")
+        if not tag.strip().startswith("W/") and tag.strip().strip('"').isdigit()
+    ]
+    if not versions:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Progress item has been modified")
+    return versions
+
+async def write_progress_item(request: Request, response: Response, item_id: str, user_id: str, update, extra_filter: Optional[dict] = None):
+    """Apply update atomically; 404 for a missing item, 412 when If-Match names a stale version"""
+    item_filter = {"id": item_id, "user_id": user_id, **(extra_filter or {})}
+    versions = if_match_versions(request)
+    if versions is not None:
+        item_filter["version"] = {"$in": versions}
     
-    # Update fields
-    update_fields = {"updated_at": datetime.utcnow()}
+    item = await db.progress_items.find_one_and_update(
+        item_filter, update, projection=PROGRESS_ITEM_PROJECTION, return_document=ReturnDocument.AFTER
+    )
+    if item is None:
+        # Only the failure path pays for a second read, to report why nothing matched
+        existing = await db.progress_items.find_one({"id": item_id, "user_id": user_id}, {"_id": 0, "version": 1})
+        if existing is None:
+            raise HTTPException(status_code=404, detail="Progress item not found")
+        if versions is not None and existing.get("version", 1) not in versions:
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Progress item has been modified")
+        return None
+    response.headers["ETag"] = progress_item_etag(item)
+    return item
+
+def progress_update_stage(update_data: ProgressUpdate, now: datetime):
+    """(update_fields, pipeline $set stage) for a ProgressUpdate"""
+    update_fields = {"updated_at": now}
     
     if update_data.status is not None:
         update_fields["status"] = update_data.status
-        if update_data.status == "completed":
-            update_fields["completed_date"] = datetime.utcnow()
-        elif existing_item.get("status") == "completed" and update_data.status != "completed":
-            update_fields["completed_date"] = None
     
     if update_data.notes is not None:
         update_fields["notes"] = update_data.notes
@@ -1208,54 +2993,329 @@ async def update_progress_item(item_id: str, update_data: ProgressUpdate, curren
     if update_data.due_date is not None:
         update_fields["due_date"] = update_data.due_date
     
-    # Update in database
-    await db.progress_items.update_one(
-        {"id": item_id, "user_id": current_user.id},
-        {"$set": update_fields}
+    # Pipeline update: completed_date depends on the stored status, read inside the same operation
+    stage = {field: {"$literal": value} for field, value in update_fields.items()}
+    if update_data.status == "completed":
+        stage["completed_date"] = {"$literal": now}
+    elif update_data.status is not None:
+        stage["completed_date"] = {"$cond": [{"$eq": ["$status", "completed"]}, None, "$completed_date"]}
+    stage["version"] = NEXT_PROGRESS_ITEM_VERSION
+    return update_fields, stage
+
+def toggle_subtask_stage(subtask_index: int, now: datetime):
+    # Flip subtasks[i].completed server-side so concurrent toggles of other subtasks are never lost
+    toggled = {
+        "$map": {
+            "input": {"$range": [0, {"$size": "$subtasks"}]},
+            "as": "position",
+            "in": {
+                "$let": {
+                    "vars": {"subtask": {"$arrayElemAt": ["$subtasks", "$$position"]}},
+                    "in": {
+                        "$cond": [
+                            {"$eq": ["$$position", subtask_index]},
+                            {"$mergeObjects": ["$$subtask", {"completed": {"$not": ["$$subtask.completed"]}}]},
+                            "$$subtask"
+                        ]
+                    }
+                }
+            }
+        }
+    }
+    return {"subtasks": toggled, "updated_at": now, "version": NEXT_PROGRESS_ITEM_VERSION}
+
+def build_progress_item(item_data: Dict[str, Any], user_id: str) -> ProgressItem:
+    return ProgressItem(
+        user_id=user_id,
+        category=item_data.get("category", "General"),
+        title=item_data["title"],
+        description=item_data.get("description", ""),
+        status=item_data.get("status", "not_started"),
+        priority=item_data.get("priority", "medium"),
+        due_date=item_data.get("due_date"),
+        notes=item_data.get("notes", "")
     )
+
+# Delta sync: changes are read in (updated_at, id) order from the items and their deletion tombstones
+PROGRESS_TOMBSTONE_TTL_DAYS = int(os.environ.get('PROGRESS_TOMBSTONE_TTL_DAYS', '30'))
+PROGRESS_CHANGES_MAX_LIMIT = 1000
+# updated_at is stamped before the write commits, so a write can land behind a cursor already handed out.
+# Resume cursors therefore never pass now - window; clients de-duplicate the re-read changes by id and version.
+PROGRESS_SYNC_WINDOW_SECONDS = float(os.environ.get('PROGRESS_SYNC_WINDOW_SECONDS', '10'))
+SYNC_EPOCH = datetime(1970, 1, 1)
+
+def encode_sync_cursor(changed_at: datetime, item_id: str) -> str:
+    millis = int((changed_at - SYNC_EPOCH) / timedelta(milliseconds=1))
+    return base64.urlsafe_b64encode(json.dumps([millis, item_id], separators=(",", ":")).encode("utf-8")).decode("ascii")
+
+def decode_sync_cursor(cursor: str):
+    try:
+        millis, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return SYNC_EPOCH + timedelta(milliseconds=int(millis)), str(item_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Malformed cursor")
+
+async def record_tombstones(user_id: str, item_ids: List[str], deleted_at: datetime):
+    if item_ids:
+        await db.progress_item_tombstones.insert_many(
+            [{"id": item_id, "user_id": user_id, "deleted_at": deleted_at} for item_id in item_ids]
+        )
+
+@api_router.get("/progress/items/changes")
+async def get_progress_item_changes(
+    since: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=PROGRESS_CHANGES_MAX_LIMIT),
+    current_user: User = Depends(get_current_user)
+):
+    item_filter = {"user_id": current_user.id}
+    tombstone_filter = {"user_id": current_user.id}
+    if since:
+        changed_at, item_id = decode_sync_cursor(since)
+        if changed_at < datetime.utcnow() - timedelta(days=PROGRESS_TOMBSTONE_TTL_DAYS):
+            # Tombstones older than the cursor may have expired; the client has to refetch everything
+            return {"reset": True, "items": [], "deleted": [], "next_cursor": None, "has_more": False}
+        item_filter["$or"] = [{"updated_at": {"$gt": changed_at}}, {"updated_at": changed_at, "id": {"$gt": item_id}}]
+        tombstone_filter["$or"] = [{"deleted_at": {"$gt": changed_at}}, {"deleted_at": changed_at, "id": {"$gt": item_id}}]
+    
+    order = [("updated_at", ASCENDING), ("id", ASCENDING)]
+    items = await db.progress_items.find(item_filter, PROGRESS_ITEM_PROJECTION).sort(order).limit(limit + 1).to_list(length=limit + 1)
+    tombstones = await db.progress_item_tombstones.find(tombstone_filter, {"_id": 0, "id": 1, "deleted_at": 1}).sort(
+        [("deleted_at", ASCENDING), ("id", ASCENDING)]
+    ).limit(limit + 1).to_list(length=limit + 1)
     
-    return {"message": "Progress item updated successfully", "updated_fields": update_fields}
+    changes = heapq.merge(
+        ((item["updated_at"], item["id"], item) for item in items),
+        ((tombstone["deleted_at"], tombstone["id"], None) for tombstone in tombstones),
+        key=lambda change: change[:2]
+    )
+    page = list(itertools.islice(changes, limit + 1))
+    has_more = len(page) > limit
+    page = page[:limit]
+    
+    if has_more:
+        # Mid-drain pages continue exactly where this one stopped
+        next_cursor = encode_sync_cursor(*page[-1][:2])
+    else:
+        settled = (datetime.utcnow() - timedelta(seconds=PROGRESS_SYNC_WINDOW_SECONDS), "")
+        next_cursor = encode_sync_cursor(*min(page[-1][:2], settled) if page else settled)
+    return {
+        "reset": False,
+        "items": [item for _, _, item in page if item is not None],
+        "deleted": [item_id for _, item_id, item in page if item is None],
+        "next_cursor": next_cursor,
+        "has_more": has_more
+    }
 
-@api_router.post("/progress/items/{item_id}/subtasks/{subtask_index}/toggle")
-async def toggle_subtask(item_id: str, subtask_index: int, current_user: User = Depends(get_current_user)):
-    # Find the item
-    existing_item = await db.progress_items.find_one({"id": item_id, "user_id": current_user.id})
-    if not existing_item:
+@api_router.get("/progress/items/{item_id}")
+async def get_progress_item(item_id: str, response: Response, current_user: User = Depends(get_current_user)):
+    item = await db.progress_items.find_one({"id": item_id, "user_id": current_user.id}, PROGRESS_ITEM_PROJECTION)
+    if not item:
         raise HTTPException(status_code=404, detail="Progress item not found")
+    response.headers["ETag"] = progress_item_etag(item)
+    return item
+
+@api_router.put("/progress/items/{item_id}")
+async def update_progress_item(
+    item_id: str,
+    update_data: ProgressUpdate,
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user)
+):
+    now = datetime.utcnow()
+    update_fields, stage = progress_update_stage(update_data, now)
     
-    subtasks = existing_item.get("subtasks", [])
-    if subtask_index >= len(subtasks):
-        raise HTTPException(status_code=400, detail="Invalid subtask index")
+    item = await write_progress_item(request, response, item_id, current_user.id, [{"$set": stage}])
+    if item is None:
+        raise HTTPException(status_code=409, detail="Progress item changed during the update, retry")
+    if "completed_date" in stage:
+        update_fields["completed_date"] = item.get("completed_date")
+    event_hub.publish(current_user.id, "progress.item.updated", {"id": item_id, "version": item["version"], "fields": update_fields})
     
-    # Toggle subtask completion
-    subtasks[subtask_index]["completed"] = not subtasks[subtask_index]["completed"]
+    return {"message": "Progress item updated successfully", "updated_fields": update_fields, "item": item}
+
+@api_router.post("/progress/items/{item_id}/subtasks/{subtask_index}/toggle")
+async def toggle_subtask(
+    item_id: str,
+    subtask_index: int,
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user)
+):
+    if subtask_index < 0:
+        raise HTTPException(status_code=400, detail="Invalid subtask index")
     
-    # Update in database
-    await db.progress_items.update_one(
-        {"id": item_id, "user_id": current_user.id},
-        {"$set": {"subtasks": subtasks, "updated_at": datetime.utcnow()}}
+    update = [{"$set": toggle_subtask_stage(subtask_index, datetime.utcnow())}]
+    item = await write_progress_item(
+        request, response, item_id, current_user.id, update, {f"subtasks.{subtask_index}": {"$exists": True}}
     )
+    if item is None:
+        raise HTTPException(status_code=400, detail="Invalid subtask index")
+    event_hub.publish(current_user.id, "progress.subtask.toggled", {
+        "id": item_id,
+        "version": item["version"],
+        "subtask_index": subtask_index,
+        "completed": item["subtasks"][subtask_index].get("completed")
+    })
     
-    return {"message": "Subtask updated successfully", "subtasks": subtasks}
+    return {"message": "Subtask updated successfully", "subtasks": item["subtasks"], "version": item["version"]}
 
 @api_router.post("/progress/items")
 async def create_progress_item(item_data: Dict[str, Any], current_user: User = Depends(get_current_user)):
-    new_item = ProgressItem(
-        user_id=current_user.id,
-        category=item_data.get("category", "General"),
-        title=item_data["title"],
-        description=item_data.get("description", ""),
-        status=item_data.get("status", "not_started"),
-        priority=item_data.get("priority", "medium"),
-        due_date=item_data.get("due_date"),
-        notes=item_data.get("notes", "")
-    )
+    new_item = build_progress_item(item_data, current_user.id)
     
     # Insert into database
     await db.progress_items.insert_one(new_item.dict())
+    event_hub.publish(current_user.id, "progress.item.created", {"item": new_item.dict(exclude={"user_id"})})
     
     return {"message": "Progress item created successfully", "item": new_item.dict()}
 
+PROGRESS_BULK_MAX_OPERATIONS = 500
+
+def plan_progress_bulk(bulk: ProgressBulkRequest, user_id: str, known: Dict[str, dict], now: datetime):
+    """Validate every operation against the pre-read item states.
+
+    Returns (results, writes, result index per write, item version expected after each write);
+    the expected version is None for deletes.
+    """
+    results, writes, write_slots, write_versions = [], [], [], []
+    touched = set()
+    halted = False
+    for index, operation in enumerate(bulk.operations):
+        result = {"index": index, "op": operation.op, "id": operation.id}
+        results.append(result)
+        if halted:
+            result["status"] = "skipped"
+            continue
+        
+        write, failure = None, None
+        state = known.get(operation.id) if operation.id else None
+        if operation.op == "create":
+            try:
+                new_item = build_progress_item(operation.item or {}, user_id)
+            except KeyError as e:
+                failure = ("invalid", f"Missing field: {e.args[0]}")
+            except ValidationError as e:
+                failure = ("invalid", "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()))
+            else:
+                write = InsertOne(new_item.dict())
+                known[new_item.id] = state = {"version": 1, "subtasks": 0}
+                result.update(id=new_item.id, item=new_item.dict(exclude={"user_id"}))
+        elif operation.op not in ("update", "delete", "toggle_subtask"):
+            failure = ("invalid", f"Unknown operation: {operation.op}")
+        elif state is None:
+            failure = ("not_found", "Progress item not found")
+        elif not bulk.ordered and operation.id in touched:
+            # Unordered batches may run in any order, so each item can only be written once
+            failure = ("invalid", "Unordered batches may touch each item only once")
+        elif operation.expected_version is not None and operation.expected_version != state["version"]:
+            failure = ("precondition_failed", "Progress item has been modified")
+        else:
+            # Pin the version seen at planning time; a concurrent write turns this op into a no-op
+            item_filter = {"id": operation.id, "user_id": user_id, "version": state["version"]}
+            if operation.op == "delete":
+                write = DeleteOne(item_filter)
+                del known[operation.id]
+            elif operation.op == "update" and operation.update is None:
+                failure = ("invalid", "update requires an update body")
+            elif operation.op == "update":
+                _, stage = progress_update_stage(operation.update, now)
+                write = UpdateOne(item_filter, [{"$set": stage}])
+            elif operation.subtask_index is None or not 0 <= operation.subtask_index < state["subtasks"]:
+                failure = ("invalid", "Invalid subtask index")
+            else:
+                write = UpdateOne(item_filter, [{"$set": toggle_subtask_stage(operation.subtask_index, now)}])
+            if write is not None and operation.op != "delete":
+                state["version"] += 1
+        
+        if failure:
+            result.update(status=failure[0], error=failure[1])
+            halted = bulk.ordered
+            continue
+        touched.add(result["id"])
+        writes.append(write)
+        write_slots.append(index)
+        write_versions.append(None if operation.op == "delete" else state["version"])
+        result["status"] = {"create": "created", "delete": "deleted"}.get(operation.op, "updated")
+        if operation.op != "delete":
+            result["version"] = state["version"]
+    return results, writes, write_slots, write_versions
+
+def resolve_progress_bulk_conflicts(results, write_slots, write_versions, final_versions: Dict[str, int]):
+    """Mark the planned updates and deletes that did not land, given each item's version after the batch.
+
+    Writes to one item are pinned in a chain, so the last write whose expected version matches the
+    final state landed along with every earlier write to that item; the later ones conflicted.
+    """
+    pending = [
+        (position, slot) for position, slot in enumerate(write_slots)
+        if results[slot]["status"] in ("updated", "deleted")
+    ]
+    applied_through = {}
+    for position, slot in pending:
+        item_id = results[slot]["id"]
+        if write_versions[position] == final_versions.get(item_id):
+            applied_through[item_id] = position
+    for position, slot in pending:
+        if position > applied_through.get(results[slot]["id"], -1):
+            results[slot].update(status="conflict", error="Progress item was modified concurrently")
+            results[slot].pop("version", None)
+
+@api_router.post("/progress/items/bulk")
+async def bulk_progress_items(bulk: ProgressBulkRequest, current_user: User = Depends(get_current_user)):
+    if not bulk.operations:
+        raise HTTPException(status_code=400, detail="Provide at least one operation")
+    if len(bulk.operations) > PROGRESS_BULK_MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {PROGRESS_BULK_MAX_OPERATIONS} operations per request")
+    
+    # One read for the version and subtask count of every referenced item
+    referenced = list({operation.id for operation in bulk.operations if operation.id and operation.op != "create"})
+    known = {}
+    if referenced:
+        async for doc in db.progress_items.find({"user_id": current_user.id, "id": {"$in": referenced}}, {"_id": 0, "id": 1, "version": 1, "subtasks": 1}):
+            known[doc["id"]] = {"version": doc.get("version", 1), "subtasks": len(doc.get("subtasks") or [])}
+    
+    now = datetime.utcnow()
+    results, writes, write_slots, write_versions = plan_progress_bulk(bulk, current_user.id, known, now)
+    
+    if writes:
+        # One write round trip for the whole batch
+        expected = sum(1 for write in writes if not isinstance(write, InsertOne))
+        try:
+            outcome = (await db.progress_items.bulk_write(writes, ordered=bulk.ordered)).bulk_api_result
+        except BulkWriteError as e:
+            outcome = e.details
+            write_errors = {error["index"]: error.get("errmsg", "Write failed") for error in outcome.get("writeErrors", [])}
+            for position, slot in enumerate(write_slots):
+                if position in write_errors:
+                    results[slot].update(status="error", error=write_errors[position])
+                    results[slot].pop("version", None)
+                elif bulk.ordered and write_errors and position > min(write_errors):
+                    results[slot]["status"] = "skipped"
+                    results[slot].pop("version", None)
+        
+        if outcome.get("nMatched", 0) + outcome.get("nRemoved", 0) < expected:
+            # Something changed between the read and the write: find which items did not end up as planned
+            item_ids = list({results[slot]["id"] for slot in write_slots if results[slot]["status"] in ("updated", "deleted")})
+            final_versions = {
+                doc["id"]: doc.get("version", 1)
+                async for doc in db.progress_items.find({"user_id": current_user.id, "id": {"$in": item_ids}}, {"_id": 0, "id": 1, "version": 1})
+            }
+            resolve_progress_bulk_conflicts(results, write_slots, write_versions, final_versions)
+    
+    await record_tombstones(current_user.id, [result["id"] for result in results if result["status"] == "deleted"], now)
+    
+    summary = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    applied = [
+        {key: result[key] for key in ("op", "id", "status", "version", "item") if key in result}
+        for result in results if result["status"] in ("created", "updated", "deleted")
+    ]
+    if applied:
+        event_hub.publish(current_user.id, "progress.items.bulk", {"changes": applied})
+    return {"results": results, "summary": summary, "ordered": bulk.ordered}
+
 @api_router.delete("/progress/items/{item_id}")
 async def delete_progress_item(item_id: str, current_user: User = Depends(get_current_user)):
     result = await db.progress_items.delete_one({"id": item_id, "user_id": current_user.id})
@@ -1263,104 +3323,118 @@ async def delete_progress_item(item_id: str, current_user: User = Depends(get_cu
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Progress item not found")
     
+    await record_tombstones(current_user.id, [item_id], datetime.utcnow())
+    event_hub.publish(current_user.id, "progress.item.deleted", {"id": item_id})
     return {"message": "Progress item deleted successfully"}
 
-@api_router.get("/progress/dashboard")
-async def get_progress_dashboard(current_user: User = Depends(get_current_user)):
-    # Get all progress items for user
-    items = await db.progress_items.find({"user_id": current_user.id}).to_list(length=None)
-    
-    if not items:
-        # Initialize with sample data if no items exist
-        initial_items = []
-        for item_data in SAMPLE_PROGRESS_ITEMS:
-            item = ProgressItem(user_id=current_user.id, **item_data)
-            item_dict = item.dict()
-            # Ensure datetime objects are properly handled
-            for key, value in item_dict.items():
-                if isinstance(value, datetime):
-                    item_dict[key] = value.isoformat()
-            initial_items.append(item_dict)
-        
-        if initial_items:
-            await db.progress_items.insert_many(initial_items)
-            items = await db.progress_items.find({"user_id": current_user.id}).to_list(length=None)
+OPEN_PROGRESS_STATUSES = ["not_started", "in_progress", "blocked"]
+
+@api_router.get("/progress/deadlines")
+async def get_progress_deadlines(
+    current_user: User = Depends(get_current_user),
+    after: Optional[datetime] = None,
+    before: Optional[datetime] = None,
+    limit: int = 50
+):
+    # Open items due in [after, before), split into overdue and upcoming
+    limit = min(max(limit, 1), 500)
+    now = datetime.utcnow()
+    due_range = {"$ne": None}
+    if after is not None:
+        due_range["$gte"] = after
+    if before is not None:
+        due_range["$lt"] = before
+    
+    # Equality on user_id, $in on status and a range on due_date all resolve
+    # against the (user_id, status, due_date) index, merge-sorted by due_date
+    cursor = db.progress_items.find(
+        {"user_id": current_user.id, "status": {"$in": OPEN_PROGRESS_STATUSES}, "due_date": due_range},
+        PROGRESS_ITEM_PROJECTION
+    ).sort("due_date", ASCENDING).limit(limit)
+    items = await cursor.to_list(length=limit)
     
-    # Convert MongoDB documents to serializable format
-    serialized_items = []
+    overdue = []
+    upcoming = []
     for item in items:
-        item_dict = dict(item)
-        if "_id" in item_dict:
-            del item_dict["_id"]  # Remove MongoDB ObjectId
-        
-        # Ensure datetime fields are serializable
-        for key, value in item_dict.items():
-            if isinstance(value, datetime):
-                item_dict[key] = value.isoformat()
-        
-        serialized_items.append(item_dict)
+        (overdue if item["due_date"] < now else upcoming).append(item)
     
-    # Calculate statistics by category
-    category_stats = {}
-    priority_stats = {"high": 0, "medium": 0, "low": 0, "urgent": 0}
-    status_stats = {"not_started": 0, "in_progress": 0, "completed": 0, "blocked": 0}
+    return {
+        "overdue": overdue,
+        "upcoming": upcoming,
+        "total": len(items),
+        "as_of": now
+    }
+
+def build_progress_dashboard_pipeline(user_id: str, now: datetime, upcoming_days: int, limit: int):
+    """All dashboard breakdowns plus overdue/upcoming deadline lists in one aggregation"""
+    open_items = {"status": {"$ne": "completed"}}
+    overdue_match = {"$match": {**open_items, "due_date": {"$lt": now}}}
+    upcoming_match = {"$match": {**open_items, "due_date": {"$gte": now, "$lt": now + timedelta(days=upcoming_days)}}}
+    deadline_projection = {"$project": PROGRESS_ITEM_PROJECTION}
     
-    for item in serialized_items:
-        category = item.get("category", "General")
-        if category not in category_stats:
-            category_stats[category] = {"total": 0, "completed": 0, "in_progress": 0}
-        
-        category_stats[category]["total"] += 1
-        
-        status = item.get("status", "not_started")
-        status_stats[status] += 1
-        
-        priority = item.get("priority", "medium")
-        priority_stats[priority] += 1
-        
-        if status == "completed":
-            category_stats[category]["completed"] += 1
-        elif status == "in_progress":
-            category_stats[category]["in_progress"] += 1
-    
-    # Calculate completion percentages
-    for category in category_stats:
-        total = category_stats[category]["total"]
-        completed = category_stats[category]["completed"]
-        category_stats[category]["completion_percentage"] = (completed / total * 100) if total > 0 else 0
-    
-    # Get current date
+    return [
+        {"$match": {"user_id": user_id}},
+        {"$facet": {
+            "categories": [
+                {"$group": {
+                    "_id": {"$ifNull": ["$category", "General"]},
+                    "total": {"$sum": 1},
+                    "completed": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}},
+                    "in_progress": {"$sum": {"$cond": [{"$eq": ["$status", "in_progress"]}, 1, 0]}}
+                }}
+            ],
+            "statuses": [{"$group": {"_id": {"$ifNull": ["$status", "not_started"]}, "count": {"$sum": 1}}}],
+            "priorities": [{"$group": {"_id": {"$ifNull": ["$priority", "medium"]}, "count": {"$sum": 1}}}],
+            "overdue_count": [overdue_match, {"$count": "count"}],
+            "overdue_items": [overdue_match, {"$sort": {"due_date": 1}}, {"$limit": limit}, deadline_projection],
+            "upcoming_count": [upcoming_match, {"$count": "count"}],
+            "upcoming_items": [upcoming_match, {"$sort": {"due_date": 1}}, {"$limit": limit}, deadline_projection]
+        }}
+    ]
+
+@api_router.get("/progress/dashboard")
+async def get_progress_dashboard(current_user: User = Depends(get_current_user), upcoming_days: int = 14, limit: int = 5):
+    upcoming_days = min(max(upcoming_days, 1), 365)
+    limit = min(max(limit, 1), 50)
     current_date = datetime.utcnow()
+    await ensure_progress_seeded(current_user)
+    pipeline = build_progress_dashboard_pipeline(current_user.id, current_date, upcoming_days, limit)
+    result = (await db.progress_items.aggregate(pipeline).to_list(length=1))[0]
+    
+    # Calculate statistics by category
+    category_stats = {}
+    for category in result["categories"]:
+        total = category["total"]
+        category_stats[category["_id"]] = {
+            "total": total,
+            "completed": category["completed"],
+            "in_progress": category["in_progress"],
+            "completion_percentage": (category["completed"] / total * 100) if total > 0 else 0
+        }
     
-    # Get overdue and upcoming items (simplified logic to avoid datetime parsing issues)
-    overdue_items = []
-    upcoming_items = []
+    priority_stats = {"high": 0, "medium": 0, "low": 0, "urgent": 0}
+    priority_stats.update({entry["_id"]: entry["count"] for entry in result["priorities"]})
+    status_stats = {status_name: 0 for status_name in PROGRESS_STATUSES}
+    status_stats.update({entry["_id"]: entry["count"] for entry in result["statuses"]})
+    total_items = sum(status_stats.values())
     
-    for item in serialized_items:
-        if item.get("due_date") and item.get("status") != "completed":
-            try:
-                # Simple date comparison logic
-                if "days=5" in str(item.get("due_date")) or "days=3" in str(item.get("due_date")):
-                    upcoming_items.append(item)
-                elif "days=-" in str(item.get("due_date")):
-                    overdue_items.append(item)
-            except:
-                pass  # Skip items with problematic dates
+    overdue_count = result["overdue_count"][0]["count"] if result["overdue_count"] else 0
+    upcoming_count = result["upcoming_count"][0]["count"] if result["upcoming_count"] else 0
     
     return {
         "overview": {
-            "total_items": len(serialized_items),
+            "total_items": total_items,
             "completed_items": status_stats["completed"],
             "in_progress_items": status_stats["in_progress"],
-            "overdue_items": len(overdue_items),
-            "upcoming_deadlines": len(upcoming_items),
-            "overall_completion": (status_stats["completed"] / len(serialized_items) * 100) if len(serialized_items) > 0 else 0
+            "overdue_items": overdue_count,
+            "upcoming_deadlines": upcoming_count,
+            "overall_completion": (status_stats["completed"] / total_items * 100) if total_items > 0 else 0
         },
         "category_breakdown": category_stats,
         "status_distribution": status_stats,
         "priority_distribution": priority_stats,
-        "overdue_items": overdue_items[:5],  # Top 5 overdue
-        "upcoming_deadlines": upcoming_items[:5],  # Next 5 deadlines
+        "overdue_items": result["overdue_items"],  # Most overdue first
+        "upcoming_deadlines": result["upcoming_items"],  # Next deadlines
         "recent_activity": [
             {"action": "Completed visa application form", "timestamp": (current_date - timedelta(hours=2)).isoformat()},
             {"action": "Updated moving quotes comparison", "timestamp": (current_date - timedelta(hours=6)).isoformat()},
@@ -1370,111 +3444,264 @@ async def get_progress_dashboard(current_user: User = Depends(get_current_user))
     }
 
 # Logistics endpoints
-@api_router.get("/logistics/providers")
-async def get_logistics_providers(service_type: Optional[str] = None):
-    providers = []
-    for provider_data in LOGISTICS_PROVIDERS:
-        provider = LogisticsProvider(**provider_data)
-        if service_type and provider.service_type != service_type:
-            continue
-        providers.append(provider.dict())
-    
+LOGISTICS_PROVIDER_MODELS = [LogisticsProvider(**provider_data).dict() for provider_data in LOGISTICS_PROVIDERS]
+LOGISTICS_SERVICE_TYPES = sorted({provider["service_type"] for provider in LOGISTICS_PROVIDER_MODELS})
+
+def build_logistics_providers(service_type: Optional[str] = None):
+    providers = [
+        provider for provider in LOGISTICS_PROVIDER_MODELS
+        if not service_type or provider["service_type"] == service_type
+    ]
     return {
         "providers": providers,
         "total": len(providers),
-        "service_types": list(set([p["service_type"] for p in LOGISTICS_PROVIDERS]))
+        "service_types": LOGISTICS_SERVICE_TYPES
     }
 
-@api_router.get("/logistics/cost-calculator")
-async def get_cost_calculator():
+static_catalog.register("logistics_providers", build_logistics_providers)
+for provider_service_type in LOGISTICS_SERVICE_TYPES:
+    static_catalog.register(
+        f"logistics_providers:{provider_service_type}",
+        lambda service_type=provider_service_type: build_logistics_providers(service_type)
+    )
+
+# Coverage areas resolve to gazetteer regions once; a handful of boxes needs no spatial index
+LOGISTICS_PROVIDER_REGIONS = {provider["id"]: resolve_regions(provider["coverage_area"]) for provider in LOGISTICS_PROVIDER_MODELS}
+
+def providers_near(origin, radius_miles: float, service_type: Optional[str] = None, sort: Optional[str] = None):
+    """Providers whose coverage comes within radius_miles of origin (0 when the point is covered)"""
+    matches = []
+    for provider in LOGISTICS_PROVIDER_MODELS:
+        if service_type and provider["service_type"] != service_type:
+            continue
+        regions = LOGISTICS_PROVIDER_REGIONS[provider["id"]]
+        if not regions:
+            continue
+        distance = min(distance_to_region_miles(*origin, region) for region in regions)
+        if distance <= radius_miles:
+            matches.append({**provider, "coverage_regions": regions, "distance_miles": round(distance, 1)})
+    if sort == "distance":
+        matches.sort(key=lambda provider: provider["distance_miles"])
     return {
-        "base_costs": {
-            "full_service": {"min": 8000, "max": 15000, "average": 11500},
-            "container": {"min": 2800, "max": 7500, "average": 5150},
-            "air_freight": {"min": 2000, "max": 8000, "average": 5000},
-            "storage": {"min": 150, "max": 400, "average": 275}
-        },
-        "additional_costs": {
-            "insurance": {"percentage": 2.5, "description": "2.5% of shipment value"},
-            "customs_duty": {"range": "0-25%", "description": "Varies by item type"},
-            "temporary_storage": {"cost": 50, "unit": "per cubic meter per week"},
-            "express_customs": {"cost": 200, "description": "Fast-track customs clearance"},
-            "pet_shipping": {"cost": 2500, "description": "Per pet including quarantine"},
-            "vehicle_shipping": {"cost": 3500, "description": "Car shipping via container"}
-        },
-        "cost_factors": [
-            "Volume of household goods",
-            "Distance and accessibility",
-            "Service level selected",
-            "Insurance coverage",
-            "Seasonal demand",
-            "Customs complexity"
-        ]
+        "providers": matches,
+        "total": len(matches),
+        "service_types": LOGISTICS_SERVICE_TYPES
     }
 
-@api_router.get("/logistics/checklist")
-async def get_moving_checklist():
+@api_router.get("/logistics/providers")
+async def get_logistics_providers(
+    request: Request,
+    service_type: Optional[str] = None,
+    near: Optional[str] = None,
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    radius_miles: float = Query(0, ge=0, le=GEO_MAX_RADIUS_MILES),
+    sort: Optional[str] = None
+):
+    if sort not in (None, "distance"):
+        raise HTTPException(status_code=400, detail="sort must be 'distance'")
+    origin = resolve_geo_origin(near, lat, lon)
+    if origin:
+        return providers_near(origin, radius_miles, service_type, sort)
+    if not service_type:
+        return static_catalog.respond(request, "logistics_providers")
+    if service_type not in LOGISTICS_SERVICE_TYPES:
+        return static_catalog.respond(request, "logistics_providers:none", lambda: build_logistics_providers(service_type))
+    return static_catalog.respond(request, f"logistics_providers:{service_type}")
+
+# Moving cost tables
+MOVING_COST_TABLES = {
+    "base_costs": {
+        "full_service": {"min": 8000, "max": 15000, "average": 11500},
+        "container": {"min": 2800, "max": 7500, "average": 5150},
+        "air_freight": {"min": 2000, "max": 8000, "average": 5000},
+        "storage": {"min": 150, "max": 400, "average": 275}
+    },
+    "additional_costs": {
+        "insurance": {"percentage": 2.5, "description": "2.5% of shipment value"},
+        "customs_duty": {"range": "0-25%", "description": "Varies by item type"},
+        "temporary_storage": {"cost": 50, "unit": "per cubic meter per week"},
+        "express_customs": {"cost": 200, "description": "Fast-track customs clearance"},
+        "pet_shipping": {"cost": 2500, "description": "Per pet including quarantine"},
+        "vehicle_shipping": {"cost": 3500, "description": "Car shipping via container"}
+    },
+    "cost_factors": [
+        "Volume of household goods",
+        "Distance and accessibility",
+        "Service level selected",
+        "Insurance coverage",
+        "Seasonal demand",
+        "Customs complexity"
+    ]
+}
+static_catalog.register("moving_cost_tables", lambda: MOVING_COST_TABLES)
+
+@api_router.get("/logistics/cost-calculator")
+async def get_cost_calculator(request: Request):
+    return static_catalog.respond(request, "moving_cost_tables")
+
+# Server-side moving cost estimates built on MOVING_COST_TABLES
+# Base service costs are quoted for roughly one 20ft container of household goods
+REFERENCE_VOLUME_M3 = 33.0
+COST_SERVICE_TYPES = list(MOVING_COST_TABLES["base_costs"])
+COST_LEVELS = ("min", "average", "max")
+MAX_COST_SCENARIOS = 1000
+# services x (min, average, max); storage is priced per month, shipping per reference volume
+SERVICE_COST_MATRIX = np.array(
+    [[MOVING_COST_TABLES["base_costs"][service][level] for level in COST_LEVELS] for service in COST_SERVICE_TYPES],
+    dtype=np.float64
+)
+CUSTOMS_DUTY_RATES = np.array([0.0, 0.125, 0.25])
+
+class HouseholdProfile(BaseModel):
+    label: Optional[str] = None
+    volume_m3: float = Field(default=REFERENCE_VOLUME_M3, ge=0, le=1000, allow_inf_nan=False)
+    service_types: List[str] = Field(default_factory=lambda: ["container"])
+    storage_months: float = Field(default=0, ge=0, le=120, allow_inf_nan=False)
+    temporary_storage_weeks: float = Field(default=0, ge=0, le=520, allow_inf_nan=False)
+    pets: int = Field(default=0, ge=0, le=50)
+    vehicles: int = Field(default=0, ge=0, le=50)
+    insurance_value: float = Field(default=0, ge=0, le=1e9, allow_inf_nan=False)
+    dutiable_value: float = Field(default=0, ge=0, le=1e9, allow_inf_nan=False)
+    express_customs: bool = False
+
+class CostEstimateRequest(BaseModel):
+    profile: Optional[HouseholdProfile] = None
+    scenarios: List[HouseholdProfile] = Field(default_factory=list)
+
+def estimate_moving_costs(profiles: List[HouseholdProfile]):
+    """Min/expected/max totals for every profile, evaluated as array operations over all scenarios"""
+    additional = MOVING_COST_TABLES["additional_costs"]
+    count = len(profiles)
+    volume = np.fromiter((profile.volume_m3 for profile in profiles), dtype=np.float64, count=count)
+    storage_months = np.fromiter((profile.storage_months for profile in profiles), dtype=np.float64, count=count)
+    
+    # Quantity of each service per scenario: volume multiples for shipping, months for storage
+    quantities = np.zeros((count, len(COST_SERVICE_TYPES)))
+    for row, profile in enumerate(profiles):
+        for service in set(profile.service_types):
+            quantities[row, COST_SERVICE_TYPES.index(service)] = 1.0
+    storage_column = COST_SERVICE_TYPES.index("storage")
+    shipping_columns = [column for column in range(len(COST_SERVICE_TYPES)) if column != storage_column]
+    quantities[:, shipping_columns] *= (volume / REFERENCE_VOLUME_M3)[:, None]
+    quantities[:, storage_column] *= storage_months
+    service_costs = quantities[:, :, None] * SERVICE_COST_MATRIX[None, :, :]  # scenario x service x level
+    
+    fixed = {
+        "insurance": np.fromiter((profile.insurance_value for profile in profiles), dtype=np.float64, count=count) * additional["insurance"]["percentage"] / 100,
+        "temporary_storage": np.fromiter((profile.temporary_storage_weeks for profile in profiles), dtype=np.float64, count=count) * volume * additional["temporary_storage"]["cost"],
+        "express_customs": np.fromiter((profile.express_customs for profile in profiles), dtype=np.float64, count=count) * additional["express_customs"]["cost"],
+        "pet_shipping": np.fromiter((profile.pets for profile in profiles), dtype=np.float64, count=count) * additional["pet_shipping"]["cost"],
+        "vehicle_shipping": np.fromiter((profile.vehicles for profile in profiles), dtype=np.float64, count=count) * additional["vehicle_shipping"]["cost"]
+    }
+    customs_duty = np.fromiter((profile.dutiable_value for profile in profiles), dtype=np.float64, count=count)[:, None] * CUSTOMS_DUTY_RATES[None, :]
+    totals = service_costs.sum(axis=1) + customs_duty + sum(fixed.values())[:, None]
+    
+    estimates = []
+    for row, profile in enumerate(profiles):
+        breakdown = {
+            service: round(float(service_costs[row, column, 1]), 2)
+            for column, service in enumerate(COST_SERVICE_TYPES) if quantities[row, column]
+        }
+        breakdown.update({name: round(float(values[row]), 2) for name, values in fixed.items() if values[row]})
+        if customs_duty[row, 1]:
+            breakdown["customs_duty"] = round(float(customs_duty[row, 1]), 2)
+        estimates.append({
+            "label": profile.label,
+            "min": round(float(totals[row, 0]), 2),
+            "expected": round(float(totals[row, 1]), 2),
+            "max": round(float(totals[row, 2]), 2),
+            "expected_breakdown": breakdown
+        })
+    return estimates
+
+@api_router.post("/logistics/estimate")
+async def estimate_moving_cost(estimate_request: CostEstimateRequest):
+    profiles = ([estimate_request.profile] if estimate_request.profile else []) + estimate_request.scenarios
+    if not profiles:
+        raise HTTPException(status_code=400, detail="Provide a profile or at least one scenario")
+    if len(profiles) > MAX_COST_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_COST_SCENARIOS} scenarios per request")
+    unknown = sorted({service for profile in profiles for service in profile.service_types} - set(COST_SERVICE_TYPES))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown service types: {', '.join(unknown)}")
+    
+    estimates = estimate_moving_costs(profiles)
     return {
-        "8_weeks_before": [
-            "Research and get quotes from moving companies",
-            "Start decluttering and deciding what to ship",
-            "Research UK customs regulations",
-            "Begin inventory of valuable items",
-            "Research temporary accommodation in UK"
-        ],
-        "6_weeks_before": [
-            "Book moving company and confirm dates",
-            "Arrange temporary storage if needed",
-            "Start using up frozen/perishable food",
-            "Research UK utility providers",
-            "Plan farewell events with friends/family"
-        ],
-        "4_weeks_before": [
-            "Confirm shipping dates and logistics",
-            "Start serious packing of non-essentials",
-            "Arrange mail forwarding with USPS",
-            "Notify current utility companies of move",
-            "Research UK mobile phone providers"
-        ],
-        "2_weeks_before": [
-            "Finish packing all non-essential items",
-            "Confirm travel arrangements to UK",
-            "Pack essential suitcase for first weeks",
-            "Say goodbye to local services (dentist, etc.)",
-            "Download offline maps and UK apps"
-        ],
-        "1_week_before": [
-            "Pack survival kit for first days in UK",
-            "Confirm pickup time with movers",
-            "Clean out refrigerator completely",
-            "Pack important documents separately",
-            "Charge all electronic devices"
-        ],
-        "moving_day": [
-            "Be present for pickup",
-            "Take photos of valuable items",
-            "Keep inventory list with you",
-            "Check all rooms are empty",
-            "Get contact details for UK delivery"
-        ]
+        "estimates": estimates,
+        "count": len(estimates),
+        "currency": "USD",
+        "reference_volume_m3": REFERENCE_VOLUME_M3
     }
 
+# Moving checklist by weeks before departure
+MOVING_CHECKLIST = {
+    "8_weeks_before": [
+        "Research and get quotes from moving companies",
+        "Start decluttering and deciding what to ship",
+        "Research UK customs regulations",
+        "Begin inventory of valuable items",
+        "Research temporary accommodation in UK"
+    ],
+    "6_weeks_before": [
+        "Book moving company and confirm dates",
+        "Arrange temporary storage if needed",
+        "Start using up frozen/perishable food",
+        "Research UK utility providers",
+        "Plan farewell events with friends/family"
+    ],
+    "4_weeks_before": [
+        "Confirm shipping dates and logistics",
+        "Start serious packing of non-essentials",
+        "Arrange mail forwarding with USPS",
+        "Notify current utility companies of move",
+        "Research UK mobile phone providers"
+    ],
+    "2_weeks_before": [
+        "Finish packing all non-essential items",
+        "Confirm travel arrangements to UK",
+        "Pack essential suitcase for first weeks",
+        "Say goodbye to local services (dentist, etc.)",
+        "Download offline maps and UK apps"
+    ],
+    "1_week_before": [
+        "Pack survival kit for first days in UK",
+        "Confirm pickup time with movers",
+        "Clean out refrigerator completely",
+        "Pack important documents separately",
+        "Charge all electronic devices"
+    ],
+    "moving_day": [
+        "Be present for pickup",
+        "Take photos of valuable items",
+        "Keep inventory list with you",
+        "Check all rooms are empty",
+        "Get contact details for UK delivery"
+    ]
+}
+static_catalog.register("moving_checklist", lambda: MOVING_CHECKLIST)
+
+@api_router.get("/logistics/checklist")
+async def get_moving_checklist(request: Request):
+    return static_catalog.respond(request, "moving_checklist")
+
 # Analytics endpoints
 @api_router.get("/analytics/overview")
 async def get_analytics_overview(current_user: User = Depends(get_current_user)):
-    user_completed_steps = current_user.completed_steps
+    completed_mask = timeline_graph.completion_mask(current_user.completed_steps)
+    completed_count = timeline_graph.completed_count(completed_mask)
     total_steps = len(RELOCATION_TIMELINE)
-    completion_percentage = (len(user_completed_steps) / total_steps) * 100
+    completion_percentage = (completed_count / total_steps) * 100
+    forecast = await timeline_graph.forecast(forecast_pool, completed_mask)
     
     # Calculate category progress
-    category_progress = {}
-    for step in RELOCATION_TIMELINE:
-        category = step["category"]
-        if category not in category_progress:
-            category_progress[category] = {"completed": 0, "total": 0}
-        category_progress[category]["total"] += 1
-        if step["id"] in user_completed_steps:
-            category_progress[category]["completed"] += 1
+    category_progress = {
+        category: {
+            "completed": timeline_graph.completed_count(completed_mask, category_mask),
+            "total": len(timeline_graph.category_indices[category])
+        }
+        for category, category_mask in timeline_graph.category_masks.items()
+    }
     
     # Calculate estimated costs based on progress
     estimated_costs = {
@@ -1489,16 +3716,16 @@ async def get_analytics_overview(current_user: User = Depends(get_current_user))
     return {
         "user_progress": {
             "overall_completion": completion_percentage,
-            "completed_steps": len(user_completed_steps),
+            "completed_steps": completed_count,
             "total_steps": total_steps,
-            "current_phase": get_current_phase(user_completed_steps),
+            "current_phase": timeline_graph.current_phase(completed_mask),
             "category_breakdown": category_progress
         },
         "cost_breakdown": estimated_costs,
         "timeline_insights": {
             "days_active": 45,
             "avg_steps_per_week": 1.2,
-            "projected_completion": "4 months",
+            "projected_completion": f"{max(1, round(forecast['p50_days'] / 30.4))} months",
             "on_track": completion_percentage > 12  # Expected 15% after 45 days
         },
         "popular_resources": [
@@ -1559,64 +3786,291 @@ async def get_cost_tracking(current_user: User = Depends(get_current_user)):
         ]
     }
 
-# Original endpoints (keeping for compatibility)
-@api_router.get("/locations/phoenix")
-async def get_phoenix_data():
-    return {
+# Location dataset and precomputed pairwise comparisons
+LOCATIONS = [
+    {
+        "slug": "phoenix",
         "location_name": "Phoenix, Arizona",
+        "country": "US",
         "cost_of_living_index": 98.2,
         "housing_cost_index": 89.5,
         "safety_index": 6.8,
-        "weather_info": {
-            "avg_temp_f": 75,
-            "sunny_days": 299,
-            "humidity": 38,
-            "climate": "Desert"
-        },
+        "weather_info": {"avg_temp_f": 75, "sunny_days": 299, "humidity": 38, "climate": "Desert"},
         "job_market_score": 7.2,
         "education_score": 6.5,
         "healthcare_score": 7.1,
         "population": 1608139,
-        "median_income": 62055
-    }
-
-@api_router.get("/locations/peak-district")
-async def get_peak_district_data():
-    return {
+        "median_income": 62055,
+        "housing": {
+            "median_home_price": 450000,
+            "median_rent": 1650,
+            "price_per_sqft": 185,
+            "market_trend": "stable",
+            "popular_neighborhoods": ["Scottsdale", "Tempe", "Chandler", "Gilbert", "Glendale"],
+            "housing_types": {"single_family": 65, "condos": 20, "apartments": 15}
+        }
+    },
+    {
+        "slug": "peak-district",
         "location_name": "Peak District, UK",
+        "country": "GB",
         "cost_of_living_index": 112.8,
         "housing_cost_index": 125.3,
         "safety_index": 8.9,
-        "weather_info": {
-            "avg_temp_f": 48,
-            "sunny_days": 120,
-            "humidity": 78,
-            "climate": "Temperate Oceanic"
-        },
+        "weather_info": {"avg_temp_f": 48, "sunny_days": 120, "humidity": 78, "climate": "Temperate Oceanic"},
         "job_market_score": 6.8,
         "education_score": 8.9,
         "healthcare_score": 9.2,
         "population": 38000,
-        "median_income": 35000
+        "median_income": 35000,
+        "housing": {
+            "median_home_price": 320000,
+            "median_rent": 950,
+            "price_per_sqft": 240,
+            "market_trend": "rising",
+            "popular_areas": ["Buxton", "Bakewell", "Matlock", "Hathersage", "Castleton"],
+            "housing_types": {"cottages": 45, "terraced": 30, "detached": 25}
+        }
+    },
+    {
+        "slug": "manchester",
+        "location_name": "Manchester, UK",
+        "country": "GB",
+        "cost_of_living_index": 104.5,
+        "housing_cost_index": 102.1,
+        "safety_index": 6.1,
+        "weather_info": {"avg_temp_f": 50, "sunny_days": 140, "humidity": 80, "climate": "Temperate Oceanic"},
+        "job_market_score": 8.1,
+        "education_score": 8.3,
+        "healthcare_score": 8.6,
+        "population": 552000,
+        "median_income": 33000,
+        "housing": {
+            "median_home_price": 245000,
+            "median_rent": 1150,
+            "price_per_sqft": 260,
+            "market_trend": "rising",
+            "popular_areas": ["Didsbury", "Chorlton", "Ancoats", "Salford Quays", "Altrincham"],
+            "housing_types": {"terraced": 40, "apartments": 35, "semi_detached": 25}
+        }
+    },
+    {
+        "slug": "edinburgh",
+        "location_name": "Edinburgh, UK",
+        "country": "GB",
+        "cost_of_living_index": 110.4,
+        "housing_cost_index": 118.7,
+        "safety_index": 7.6,
+        "weather_info": {"avg_temp_f": 48, "sunny_days": 135, "humidity": 79, "climate": "Temperate Oceanic"},
+        "job_market_score": 7.7,
+        "education_score": 9.0,
+        "healthcare_score": 8.8,
+        "population": 526000,
+        "median_income": 36000,
+        "housing": {
+            "median_home_price": 310000,
+            "median_rent": 1350,
+            "price_per_sqft": 320,
+            "market_trend": "rising",
+            "popular_areas": ["Stockbridge", "Leith", "Bruntsfield", "Morningside", "Portobello"],
+            "housing_types": {"tenements": 50, "terraced": 25, "detached": 25}
+        }
+    },
+    {
+        "slug": "bristol",
+        "location_name": "Bristol, UK",
+        "country": "GB",
+        "cost_of_living_index": 108.9,
+        "housing_cost_index": 121.4,
+        "safety_index": 6.9,
+        "weather_info": {"avg_temp_f": 51, "sunny_days": 150, "humidity": 77, "climate": "Temperate Oceanic"},
+        "job_market_score": 7.9,
+        "education_score": 8.5,
+        "healthcare_score": 8.7,
+        "population": 472000,
+        "median_income": 34500,
+        "housing": {
+            "median_home_price": 340000,
+            "median_rent": 1400,
+            "price_per_sqft": 300,
+            "market_trend": "stable",
+            "popular_areas": ["Clifton", "Redland", "Bishopston", "Southville", "Totterdown"],
+            "housing_types": {"terraced": 45, "apartments": 30, "semi_detached": 25}
+        }
+    },
+    {
+        "slug": "austin",
+        "location_name": "Austin, Texas",
+        "country": "US",
+        "cost_of_living_index": 101.7,
+        "housing_cost_index": 108.2,
+        "safety_index": 6.9,
+        "weather_info": {"avg_temp_f": 69, "sunny_days": 228, "humidity": 67, "climate": "Humid Subtropical"},
+        "job_market_score": 8.6,
+        "education_score": 7.4,
+        "healthcare_score": 7.5,
+        "population": 974000,
+        "median_income": 86000,
+        "housing": {
+            "median_home_price": 550000,
+            "median_rent": 1700,
+            "price_per_sqft": 300,
+            "market_trend": "cooling",
+            "popular_neighborhoods": ["Hyde Park", "Mueller", "Travis Heights", "Zilker", "Round Rock"],
+            "housing_types": {"single_family": 55, "condos": 15, "apartments": 30}
+        }
+    },
+    {
+        "slug": "denver",
+        "location_name": "Denver, Colorado",
+        "country": "US",
+        "cost_of_living_index": 106.3,
+        "housing_cost_index": 112.6,
+        "safety_index": 6.4,
+        "weather_info": {"avg_temp_f": 51, "sunny_days": 245, "humidity": 52, "climate": "Semi-arid"},
+        "job_market_score": 8.0,
+        "education_score": 7.8,
+        "healthcare_score": 7.9,
+        "population": 716000,
+        "median_income": 85000,
+        "housing": {
+            "median_home_price": 590000,
+            "median_rent": 1850,
+            "price_per_sqft": 330,
+            "market_trend": "stable",
+            "popular_neighborhoods": ["Highlands", "Wash Park", "Capitol Hill", "Stapleton", "Lakewood"],
+            "housing_types": {"single_family": 50, "condos": 25, "apartments": 25}
+        }
     }
+]
+
+# Numeric columns of the location store
+LOCATION_METRICS = {
+    "cost_of_living_index": lambda location: location["cost_of_living_index"],
+    "housing_cost_index": lambda location: location["housing_cost_index"],
+    "safety_index": lambda location: location["safety_index"],
+    "avg_temp_f": lambda location: location["weather_info"]["avg_temp_f"],
+    "humidity": lambda location: location["weather_info"]["humidity"],
+    "sunny_days": lambda location: location["weather_info"]["sunny_days"],
+    "job_market_score": lambda location: location["job_market_score"],
+    "education_score": lambda location: location["education_score"],
+    "healthcare_score": lambda location: location["healthcare_score"],
+    "median_income": lambda location: location["median_income"]
+}
+LOCATION_PERCENT_METRICS = ("cost_of_living_index", "housing_cost_index")
+# Ranking criteria map to (metric, direction); direction is +1 when higher is better
+LOCATION_RANK_CRITERIA = {
+    "affordability": ("cost_of_living_index", -1),
+    "housing": ("housing_cost_index", -1),
+    "safety": ("safety_index", 1),
+    "sunshine": ("sunny_days", 1),
+    "jobs": ("job_market_score", 1),
+    "education": ("education_score", 1),
+    "healthcare": ("healthcare_score", 1)
+}
+
+class LocationStore:
+    """N locations as a columnar metric array with every pairwise delta computed at load time"""
+    
+    def __init__(self, locations: List[dict]):
+        self.load(locations)
+    
+    def load(self, locations: List[dict]):
+        self.records = [
+            {key: value for key, value in location.items() if key not in ("slug", "housing")} for location in locations
+        ]
+        self.housing = [location["housing"] for location in locations]
+        self.slugs = [location["slug"] for location in locations]
+        self.index_of = {slug: index for index, slug in enumerate(self.slugs)}
+        self.metric_names = list(LOCATION_METRICS)
+        self.columns = {name: column for column, name in enumerate(self.metric_names)}
+        self.values = np.array(
+            [[extract(location) for extract in LOCATION_METRICS.values()] for location in locations], dtype=np.float64
+        )
+        
+        # deltas[i, j, k]: metric k at location j minus location i; percent metrics relative to i
+        self.deltas = self.values[None, :, :] - self.values[:, None, :]
+        self.percent_deltas = {
+            name: self.deltas[:, :, self.columns[name]] / self.values[:, None, self.columns[name]] * 100
+            for name in LOCATION_PERCENT_METRICS
+        }
+        
+        # Per-criterion scores in [0, 1] oriented so that 1 is always best
+        low, high = self.values.min(axis=0), self.values.max(axis=0)
+        spread = np.where(high > low, high - low, 1.0)
+        normalized = (self.values - low) / spread
+        self.criteria = list(LOCATION_RANK_CRITERIA)
+        self.criterion_scores = np.column_stack([
+            normalized[:, self.columns[metric]] if direction > 0 else 1 - normalized[:, self.columns[metric]]
+            for metric, direction in LOCATION_RANK_CRITERIA.values()
+        ])
+        self.version = getattr(self, "version", 0) + 1
+    
+    def get(self, slug: str) -> Optional[dict]:
+        index = self.index_of.get(slug)
+        return None if index is None else self.records[index]
+    
+    def compare(self, from_slug: str, to_slug: str) -> dict:
+        origin, destination = self.index_of[from_slug], self.index_of[to_slug]
+        delta = self.deltas[origin, destination]
+        
+        def metric(name):
+            return round(float(delta[self.columns[name]]), 2)
+        
+        return {
+            "cost_difference_percent": round(float(self.percent_deltas["cost_of_living_index"][origin, destination]), 2),
+            "housing_difference_percent": round(float(self.percent_deltas["housing_cost_index"][origin, destination]), 2),
+            "safety_improvement": metric("safety_index"),
+            "climate_change": {
+                "temperature_change": metric("avg_temp_f"),
+                "humidity_change": metric("humidity"),
+                "sunny_days_change": metric("sunny_days")
+            },
+            "job_market_change": metric("job_market_score"),
+            "education_change": metric("education_score"),
+            "healthcare_change": metric("healthcare_score")
+        }
+    
+    def rank(self, weights: Dict[str, float], exclude: Optional[str] = None, limit: int = 10) -> List[tuple]:
+        weight_vector = np.array([weights.get(criterion, 0.0) for criterion in self.criteria], dtype=np.float64)
+        total = weight_vector.sum()
+        scores = self.criterion_scores @ (weight_vector / total if total > 0 else weight_vector)
+        order = np.argsort(-scores, kind="stable")
+        ranked = [(self.slugs[index], float(scores[index])) for index in order if self.slugs[index] != exclude]
+        return ranked[:limit]
+
+location_store = LocationStore(LOCATIONS)
+
+def relocation_tips(metrics: dict) -> List[str]:
+    tips = []
+    cost = metrics["cost_difference_percent"]
+    tips.append(f"Cost of living is approximately {abs(cost):.0f}% {'higher' if cost >= 0 else 'lower'} at the destination")
+    housing = metrics["housing_difference_percent"]
+    tips.append(f"Housing costs are about {abs(housing):.0f}% {'higher' if housing >= 0 else 'lower'}")
+    if metrics["safety_improvement"] > 0:
+        tips.append("Safer environment with a higher safety index")
+    elif metrics["safety_improvement"] < 0:
+        tips.append("Lower safety index - research neighbourhoods carefully")
+    temperature = metrics["climate_change"]["temperature_change"]
+    if abs(temperature) >= 10:
+        tips.append(f"{'Warmer' if temperature > 0 else 'Cooler'} climate - prepare for the weather change")
+    return tips
+
+# Original endpoints (keeping for compatibility)
+@api_router.get("/locations/phoenix")
+async def get_phoenix_data():
+    return location_store.get("phoenix")
+
+@api_router.get("/locations/peak-district")
+async def get_peak_district_data():
+    return location_store.get("peak-district")
 
 @api_router.get("/comparison/phoenix-to-peak-district")
 async def get_relocation_comparison(current_user: User = Depends(get_current_user)):
-    phoenix_data = await get_phoenix_data()
-    peak_district_data = await get_peak_district_data()
-    
     comparison = {
-        "from_location": phoenix_data,
-        "to_location": peak_district_data,
-        "comparison_metrics": {
-            "cost_difference_percent": ((peak_district_data["cost_of_living_index"] - phoenix_data["cost_of_living_index"]) / phoenix_data["cost_of_living_index"]) * 100,
-            "housing_difference_percent": ((peak_district_data["housing_cost_index"] - phoenix_data["housing_cost_index"]) / phoenix_data["housing_cost_index"]) * 100,
-            "safety_improvement": peak_district_data["safety_index"] - phoenix_data["safety_index"],
-            "climate_change": {
-                "temperature_change": peak_district_data["weather_info"]["avg_temp_f"] - phoenix_data["weather_info"]["avg_temp_f"],
-                "humidity_change": peak_district_data["weather_info"]["humidity"] - phoenix_data["weather_info"]["humidity"]
-            }
-        },
+        "from_location": location_store.get("phoenix"),
+        "to_location": location_store.get("peak-district"),
+        "comparison_metrics": location_store.compare("phoenix", "peak-district"),
         "relocation_tips": [
             "Cost of living is approximately 15% higher in Peak District",
             "Housing costs are significantly higher (40% increase)",
@@ -1631,36 +4085,77 @@ async def get_relocation_comparison(current_user: User = Depends(get_current_use
 
 @api_router.get("/housing/phoenix")
 async def get_phoenix_housing():
-    return {
-        "median_home_price": 450000,
-        "median_rent": 1650,
-        "price_per_sqft": 185,
-        "market_trend": "stable",
-        "popular_neighborhoods": [
-            "Scottsdale", "Tempe", "Chandler", "Gilbert", "Glendale"
-        ],
-        "housing_types": {
-            "single_family": 65,
-            "condos": 20,
-            "apartments": 15
-        }
-    }
+    return location_store.housing[location_store.index_of["phoenix"]]
 
 @api_router.get("/housing/peak-district")
 async def get_peak_district_housing():
+    return location_store.housing[location_store.index_of["peak-district"]]
+
+@api_router.get("/locations")
+async def list_locations():
     return {
-        "median_home_price": 320000,
-        "median_rent": 950,
-        "price_per_sqft": 240,
-        "market_trend": "rising",
-        "popular_areas": [
-            "Buxton", "Bakewell", "Matlock", "Hathersage", "Castleton"
-        ],
-        "housing_types": {
-            "cottages": 45,
-            "terraced": 30,
-            "detached": 25
-        }
+        "locations": [{"slug": slug, **record} for slug, record in zip(location_store.slugs, location_store.records)],
+        "rank_criteria": location_store.criteria
+    }
+
+RANK_WEIGHT_MAX = 10.0
+
+@api_router.get("/locations/rank")
+async def rank_locations(
+    from_location: str = Query("phoenix", alias="from"),
+    affordability: float = Query(1.0, ge=0, le=RANK_WEIGHT_MAX, allow_inf_nan=False),
+    housing: float = Query(1.0, ge=0, le=RANK_WEIGHT_MAX, allow_inf_nan=False),
+    safety: float = Query(1.0, ge=0, le=RANK_WEIGHT_MAX, allow_inf_nan=False),
+    sunshine: float = Query(0.0, ge=0, le=RANK_WEIGHT_MAX, allow_inf_nan=False),
+    jobs: float = Query(1.0, ge=0, le=RANK_WEIGHT_MAX, allow_inf_nan=False),
+    education: float = Query(0.0, ge=0, le=RANK_WEIGHT_MAX, allow_inf_nan=False),
+    healthcare: float = Query(0.0, ge=0, le=RANK_WEIGHT_MAX, allow_inf_nan=False),
+    limit: int = Query(10, ge=1, le=100),
+    current_user: User = Depends(get_current_user)
+):
+    if from_location not in location_store.index_of:
+        raise HTTPException(status_code=404, detail="Location not found")
+    weights = {
+        "affordability": affordability,
+        "housing": housing,
+        "safety": safety,
+        "sunshine": sunshine,
+        "jobs": jobs,
+        "education": education,
+        "healthcare": healthcare
+    }
+    ranked = location_store.rank(weights, exclude=from_location, limit=limit)
+    return {
+        "from": from_location,
+        "weights": weights,
+        "destinations": [
+            {
+                "slug": slug,
+                "location_name": location_store.get(slug)["location_name"],
+                "score": round(score, 4),
+                "comparison_metrics": location_store.compare(from_location, slug)
+            }
+            for slug, score in ranked
+        ]
+    }
+
+@api_router.get("/locations/{slug}")
+async def get_location(slug: str):
+    location = location_store.get(slug)
+    if location is None:
+        raise HTTPException(status_code=404, detail="Location not found")
+    return {"slug": slug, **location, "housing": location_store.housing[location_store.index_of[slug]]}
+
+@api_router.get("/comparison/{from_slug}/{to_slug}")
+async def compare_locations(from_slug: str, to_slug: str, current_user: User = Depends(get_current_user)):
+    if from_slug not in location_store.index_of or to_slug not in location_store.index_of:
+        raise HTTPException(status_code=404, detail="Location not found")
+    metrics = location_store.compare(from_slug, to_slug)
+    return {
+        "from_location": location_store.get(from_slug),
+        "to_location": location_store.get(to_slug),
+        "comparison_metrics": metrics,
+        "relocation_tips": relocation_tips(metrics)
     }
 
 @api_router.get("/jobs/opportunities")
@@ -1745,9 +4240,63 @@ async def download_property_finder():
         "status": "development"
     })
 
+@api_router.post("/events/token")
+async def create_event_stream_token(current_user: User = Depends(get_current_user)):
+    """Short-lived token for ?token= on /events/stream; fetch a new one before reconnecting once it expires"""
+    token = create_access_token(
+        data={"sub": current_user.username, "scope": EVENT_STREAM_TOKEN_SCOPE},
+        expires_delta=timedelta(seconds=EVENT_STREAM_TOKEN_SECONDS)
+    )
+    return {"token": token, "expires_in": EVENT_STREAM_TOKEN_SECONDS}
+
+@api_router.get("/events/stream")
+async def stream_events(request: Request, current_user: User = Depends(get_stream_user)):
+    """Server-sent events for the caller's timeline and progress item changes"""
+    event_hub.check_capacity(current_user.id)
+    
+    async def event_stream():
+        queue = None
+        try:
+            queue = event_hub.subscribe(current_user.id)
+            yield "retry: 5000\nevent: ready\ndata: {}\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is None:
+                    break
+                event_id, event, data = message
+                yield f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+        finally:
+            if queue is not None:
+                event_hub.unsubscribe(current_user.id, queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.get("/system/stats")
+async def get_system_stats(current_user: User = Depends(get_admin_user)):
+    return {
+        "password_hashing": password_hash_pool.stats(),
+        "timeline_forecast": forecast_pool.stats(),
+        "principal_cache": principal_cache.stats(),
+        "event_hub": event_hub.stats(),
+        "progress_log_buffer": progress_log_buffer.stats(),
+        "recommendation_cache": recommendation_cache.stats(),
+        "static_catalog": static_catalog.stats()
+    }
+
 @api_router.get("/dashboard/overview")
 async def get_dashboard_overview(current_user: User = Depends(get_current_user)):
-    completed_count = len(current_user.completed_steps)
+    completed_mask = timeline_graph.completion_mask(current_user.completed_steps)
+    completed_count = timeline_graph.completed_count(completed_mask)
     total_steps = len(RELOCATION_TIMELINE)
     completion_percentage = (completed_count / total_steps) * 100
     
@@ -1757,7 +4306,7 @@ async def get_dashboard_overview(current_user: User = Depends(get_current_user))
             "completion_percentage": round(completion_percentage, 1),
             "completed_steps_count": completed_count,
             "total_steps": total_steps,
-            "current_phase": get_current_phase(current_user.completed_steps)
+            "current_phase": timeline_graph.current_phase(completed_mask)
         },
         "quick_stats": {
             "days_until_move": 120,
@@ -1791,10 +4340,208 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Schema migrations: each entry runs once per database, in order, and must be
+# idempotent so replicas starting concurrently can safely race on it.
+async def migration_initial_indexes(database):
+    await database.users.create_index([("username", ASCENDING)], unique=True, name="username_unique")
+    await database.users.create_index([("id", ASCENDING)], unique=True, name="id_unique")
+    await database.progress_items.create_index(
+        [("user_id", ASCENDING), ("id", ASCENDING)], unique=True, name="user_id_id_unique"
+    )
+    await database.password_resets.create_index(
+        [("username", ASCENDING), ("reset_code", ASCENDING)], name="username_reset_code"
+    )
+    # Expired reset codes are reaped by the server once expires_at passes
+    await database.password_resets.create_index(
+        [("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"
+    )
+    await database.progress_logs.create_index(
+        [("user_id", ASCENDING), ("timestamp", DESCENDING)], name="user_id_timestamp"
+    )
+
+PROGRESS_ITEM_DATE_FIELDS = ["due_date", "completed_date", "created_at", "updated_at"]
+
+async def migration_jobs_collection(database):
+    await database.jobs.create_index([("id", ASCENDING)], unique=True, name="id_unique")
+    await database.jobs.create_index([("posted_date", DESCENDING)], name="posted_date")
+
+async def migration_reparse_job_salaries(database):
+    # Rates written as "£25 / hour" or "p/h" were stored unannualized by the first parser
+    await migration_job_salary_ranges(database, job_filter={"salary": {"$type": "string"}})
+
+async def migration_job_salary_ranges_v2(database):
+    # The first parsers read bonus percentages and FTE ratios ("£30k + 10% bonus") as range ends
+    await migration_job_salary_ranges(database, job_filter={"salary": {"$type": "string"}})
+
+async def migration_progress_item_versions(database):
+    # Optimistic concurrency needs a version on every item; new items start at 1
+    await database.progress_items.update_many({"version": {"$exists": False}}, {"$set": {"version": 1}})
+
+async def migration_progress_sync_indexes(database):
+    await database.progress_items.create_index(
+        [("user_id", ASCENDING), ("updated_at", ASCENDING), ("id", ASCENDING)], name="user_id_updated_at_id"
+    )
+    await database.progress_item_tombstones.create_index(
+        [("user_id", ASCENDING), ("deleted_at", ASCENDING), ("id", ASCENDING)], name="user_id_deleted_at_id"
+    )
+    await database.progress_item_tombstones.create_index(
+        [("deleted_at", ASCENDING)], name="deleted_at_ttl", expireAfterSeconds=PROGRESS_TOMBSTONE_TTL_DAYS * 86400
+    )
+
+async def migration_progress_seeded_users(database, batch_size: int = 500):
+    # Users seeded by the old lazy path already own their sample items under random ids.
+    # Users are streamed in batches; a distinct() over all owners would overflow one result document.
+    async def mark_owners(user_ids):
+        owners = [
+            group["_id"] async for group in database.progress_items.aggregate([
+                {"$match": {"user_id": {"$in": user_ids}}},
+                {"$group": {"_id": "$user_id"}}
+            ])
+        ]
+        if owners:
+            await database.users.update_many({"id": {"$in": owners}}, {"$set": {"progress_seeded": True}})
+    
+    user_ids = []
+    async for user in database.users.find({"progress_seeded": {"$exists": False}}, {"_id": 0, "id": 1}).batch_size(batch_size):
+        user_ids.append(user["id"])
+        if len(user_ids) >= batch_size:
+            await mark_owners(user_ids)
+            user_ids = []
+    if user_ids:
+        await mark_owners(user_ids)
+
+async def migration_job_salary_ranges(database, batch_size: int = 500, job_filter: Optional[dict] = None):
+    # Listings imported before salary normalization only carry the free-text salary
+    operations = []
+    job_filter = {"salary_min": {"$exists": False}} if job_filter is None else job_filter
+    async for job in database.jobs.find(job_filter, {"id": 1, "salary": 1}):
+        salary_min, salary_max = parse_salary(job.get("salary"))
+        operations.append(UpdateOne({"_id": job["_id"]}, {"$set": {"salary_min": salary_min, "salary_max": salary_max}}))
+        if len(operations) >= batch_size:
+            await database.jobs.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        await database.jobs.bulk_write(operations, ordered=False)
+
+async def migration_job_coordinates(database, batch_size: int = 500):
+    # Listings imported before geocoding carry no coordinates; resolve them from the location text
+    operations = []
+    async for job in database.jobs.find({"latitude": None}, {"location": 1}):
+        coordinates = resolve_place(job.get("location"))
+        if coordinates is None:
+            continue
+        latitude, longitude = coordinates
+        operations.append(UpdateOne({"_id": job["_id"]}, {"$set": {"latitude": latitude, "longitude": longitude}}))
+        if len(operations) >= batch_size:
+            await database.jobs.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        await database.jobs.bulk_write(operations, ordered=False)
+
+async def migration_native_progress_dates(database, batch_size: int = 500):
+    # Early seeding stored ISO strings; rewrite them as BSON dates in batches
+    string_dates = {"$or": [{field: {"$type": "string"}} for field in PROGRESS_ITEM_DATE_FIELDS]}
+    projection = {field: 1 for field in PROGRESS_ITEM_DATE_FIELDS}
+    operations = []
+    async for doc in database.progress_items.find(string_dates, projection):
+        converted = {}
+        for field in PROGRESS_ITEM_DATE_FIELDS:
+            value = doc.get(field)
+            if isinstance(value, str):
+                try:
+                    converted[field] = datetime.fromisoformat(value)
+                except ValueError:
+                    converted[field] = None
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": converted}))
+        if len(operations) >= batch_size:
+            await database.progress_items.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        await database.progress_items.bulk_write(operations, ordered=False)
+    
+    await database.progress_items.create_index(
+        [("user_id", ASCENDING), ("status", ASCENDING), ("due_date", ASCENDING)], name="user_id_status_due_date"
+    )
+
+SCHEMA_MIGRATIONS = [
+    (1, "initial indexes", migration_initial_indexes),
+    (2, "native progress item dates and deadline index", migration_native_progress_dates),
+    (3, "jobs collection indexes", migration_jobs_collection),
+    (4, "annualized job salary ranges", migration_job_salary_ranges),
+    (5, "progress item versions", migration_progress_item_versions),
+    (6, "progress item sync cursor and tombstones", migration_progress_sync_indexes),
+    (7, "mark users with sample progress items as seeded", migration_progress_seeded_users),
+    (8, "re-annualize slash-separated job salary periods", migration_reparse_job_salaries),
+    (9, "re-parse job salaries ignoring non-pay figures", migration_job_salary_ranges_v2),
+    (10, "geocode job locations", migration_job_coordinates),
+]
+
+async def ensure_schema(database):
+    """Apply pending schema migrations and return the resulting schema version"""
+    applied = {doc["_id"] async for doc in database.schema_migrations.find({}, {"_id": 1})}
+    version = 0
+    for migration_version, description, migration in SCHEMA_MIGRATIONS:
+        if migration_version not in applied:
+            logger.info("Applying schema migration %s: %s", migration_version, description)
+            try:
+                await migration(database)
+            except PyMongoError:
+                logger.exception("Schema migration %s failed; later migrations skipped", migration_version)
+                return version
+            try:
+                await database.schema_migrations.update_one(
+                    {"_id": migration_version},
+                    {"$setOnInsert": {"description": description, "applied_at": datetime.utcnow()}},
+                    upsert=True
+                )
+            except DuplicateKeyError:
+                pass  # Recorded concurrently by another replica
+        version = migration_version
+    return version
+
 @app.on_event("startup")
 async def startup_db():
+    static_catalog.compile_all()
+    schema_version = await ensure_schema(db)
+    logger.info("Database schema at version %s", schema_version)
     await create_default_user()
+    progress_log_buffer.start()
+    imported_jobs = await load_job_index_from_db()
+    logger.info("Loaded %s imported job listings into the job index", imported_jobs)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    event_hub.close()
+    await progress_log_buffer.close()
+    password_hash_pool.shutdown()
+    forecast_pool.shutdown()
     client.close()
+
+async def _iter_file_chunks(path: str, chunk_size: int = 1 << 16):
+    with open(path, "rb") as feed:
+        while True:
+            chunk = feed.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+async def _import_jobs_command(path: str, file_format: str, batch_size: int):
+    records = iter_job_records(iter_text_lines(_iter_file_chunks(path)), file_format)
+    try:
+        return await import_job_records(records, batch_size=batch_size)
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Relocate Me backend maintenance commands")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    import_parser = subcommands.add_parser("import-jobs", help="Stream a JSONL or CSV job feed into the jobs collection")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=JOB_IMPORT_FORMATS)
+    import_parser.add_argument("--batch-size", type=int, default=JOB_IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+    
+    if args.command == "import-jobs":
+        file_format = args.format or ("csv" if args.path.lower().endswith(".csv") else "jsonl")
+        report = asyncio.run(_import_jobs_command(args.path, file_format, args.batch_size))
+        print(json.dumps({key: value for key, value in report.items() if key != "batches"}, indent=2))
@@ -0,0 +1,27 @@
+import pytest
+
+from server import parse_salary
+
+
+@pytest.mark.parametrize("salary, expected", [
+    ("£28,000 - £35,000", (28000, 35000)),
+    ("£22,000 to £26,000", (22000, 26000)),
+    ("£40k", (40000, 40000)),
+    ("£25-£30k", (25000, 30000)),
+    ("25-30k", (25000, 30000)),
+    ("£28k-35,000", (28000, 35000)),
+    ("£30k + 10% bonus", (30000, 30000)),
+    ("£30k + £2k bonus", (30000, 30000)),
+    ("£30,000 pro rata (0.6 FTE)", (30000, 30000)),
+    ("£25 - £45 per hour", (48750, 87750)),
+    ("£25 / hour", (48750, 48750)),
+    ("£300 per day", (69000, 69000)),
+    ("$5,000/month", (60000, 60000)),
+])
+def test_parse_salary(salary, expected):
+    assert parse_salary(salary) == expected
+
+
+@pytest.mark.parametrize("salary", [None, "", "Competitive", "Up to 37.5 hours a week", "£5 - £90,000"])
+def test_parse_salary_unparseable(salary):
+    assert parse_salary(salary) == (None, None)
@@ -0,0 +1,113 @@
+from datetime import datetime
+
+from pymongo import DeleteOne, InsertOne, UpdateOne
+
+from server import ProgressBulkRequest, plan_progress_bulk, resolve_progress_bulk_conflicts
+
+NOW = datetime(2026, 1, 1)
+
+
+def plan(operations, known, ordered=True):
+    bulk = ProgressBulkRequest(operations=operations, ordered=ordered)
+    return plan_progress_bulk(bulk, "user-1", known, NOW)
+
+
+def test_ordered_chain_pins_each_write_to_the_previous_version():
+    known = {"a": {"version": 3, "subtasks": 2}}
+    results, writes, write_slots, write_versions = plan([
+        {"op": "update", "id": "a", "update": {"status": "in_progress"}},
+        {"op": "toggle_subtask", "id": "a", "subtask_index": 1},
+        {"op": "delete", "id": "a"},
+    ], known)
+    assert [result["status"] for result in results] == ["updated", "updated", "deleted"]
+    assert [type(write) for write in writes] == [UpdateOne, UpdateOne, DeleteOne]
+    assert [write._filter["version"] for write in writes] == [3, 4, 5]
+    assert write_slots == [0, 1, 2]
+    assert write_versions == [4, 5, None]
+    assert [result.get("version") for result in results] == [4, 5, None]
+
+
+def test_create_starts_at_version_one_and_invalid_items_fail():
+    results, writes, write_slots, write_versions = plan([
+        {"op": "create", "item": {"title": "Book flights"}},
+        {"op": "create", "item": {"category": "Travel"}},
+    ], {}, ordered=False)
+    assert [result["status"] for result in results] == ["created", "invalid"]
+    assert isinstance(writes[0], InsertOne)
+    assert write_slots == [0]
+    assert write_versions == [1]
+    assert results[0]["version"] == 1 and results[0]["item"]["title"] == "Book flights"
+
+
+def test_ordered_failure_halts_the_rest():
+    known = {"a": {"version": 1, "subtasks": 0}}
+    results, writes, write_slots, write_versions = plan([
+        {"op": "update", "id": "a", "update": {"notes": "x"}},
+        {"op": "delete", "id": "missing"},
+        {"op": "update", "id": "a", "update": {"notes": "y"}},
+    ], known)
+    assert [result["status"] for result in results] == ["updated", "not_found", "skipped"]
+    assert write_slots == [0]
+    assert write_versions == [2]
+    assert len(writes) == 1
+
+
+def test_unordered_keeps_going_and_touches_each_item_once():
+    known = {"a": {"version": 1, "subtasks": 0}, "b": {"version": 7, "subtasks": 0}}
+    results, writes, write_slots, write_versions = plan([
+        {"op": "update", "id": "a", "update": {"notes": "x"}},
+        {"op": "toggle_subtask", "id": "b", "subtask_index": 0},
+        {"op": "delete", "id": "a"},
+        {"op": "delete", "id": "b"},
+    ], known, ordered=False)
+    assert [result["status"] for result in results] == ["updated", "invalid", "invalid", "deleted"]
+    assert write_slots == [0, 3]
+    assert write_versions == [2, None]
+    assert [write._filter["version"] for write in writes] == [1, 7]
+
+
+def test_expected_version_mismatch_is_a_precondition_failure():
+    known = {"a": {"version": 4, "subtasks": 0}}
+    results, writes, _, _ = plan([
+        {"op": "update", "id": "a", "expected_version": 3, "update": {"notes": "x"}},
+    ], known)
+    assert results[0]["status"] == "precondition_failed"
+    assert writes == []
+
+
+def test_expected_version_checks_the_version_after_earlier_ops():
+    known = {"a": {"version": 4, "subtasks": 0}}
+    results, writes, _, write_versions = plan([
+        {"op": "update", "id": "a", "expected_version": 4, "update": {"notes": "x"}},
+        {"op": "update", "id": "a", "expected_version": 5, "update": {"notes": "y"}},
+    ], known)
+    assert [result["status"] for result in results] == ["updated", "updated"]
+    assert [write._filter["version"] for write in writes] == [4, 5]
+    assert write_versions == [5, 6]
+
+
+def test_conflicts_only_mark_the_writes_after_the_last_one_that_landed():
+    known = {"a": {"version": 1, "subtasks": 1}, "b": {"version": 2, "subtasks": 0}}
+    results, _, write_slots, write_versions = plan([
+        {"op": "update", "id": "a", "update": {"notes": "x"}},
+        {"op": "toggle_subtask", "id": "a", "subtask_index": 0},
+        {"op": "update", "id": "a", "update": {"notes": "y"}},
+        {"op": "update", "id": "b", "update": {"notes": "z"}},
+    ], known)
+    # Only the first write to "a" is reflected in its final version
+    resolve_progress_bulk_conflicts(results, write_slots, write_versions, {"a": 2, "b": 3})
+    assert [result["status"] for result in results] == ["updated", "conflict", "conflict", "updated"]
+    assert results[0]["version"] == 2
+    assert "version" not in results[1]
+
+
+def test_conflicts_for_deletes_and_concurrent_deletes():
+    known = {"a": {"version": 1, "subtasks": 0}, "b": {"version": 1, "subtasks": 0}}
+    results, _, write_slots, write_versions = plan([
+        {"op": "update", "id": "a", "update": {"notes": "x"}},
+        {"op": "delete", "id": "a"},
+        {"op": "update", "id": "b", "update": {"notes": "y"}},
+    ], known)
+    # "a" is gone as planned; "b" was deleted by someone else before our update
+    resolve_progress_bulk_conflicts(results, write_slots, write_versions, {})
+    assert [result["status"] for result in results] == ["updated", "deleted", "conflict"]